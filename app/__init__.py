@@ -3,6 +3,19 @@ from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 
+from app import (
+    auth,
+    cache,
+    compression,
+    fines,
+    instrumentation,
+    invalidation,
+    passwords,
+    pool,
+    replicas,
+    serializers,
+    throttle,
+)
 from app.routes import admin_bp, books_bp, users_bp
 from config.config import Config
 
@@ -14,10 +27,18 @@ swagger = Swagger(template_file="../config/swagger.yml")
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    serializers.init_app(app)
 
+    pool.init_app(app)
     db.init_app(app)
     Migrate(app, db)
     JWTManager(app)
+    auth.init_app(app)
+    passwords.init_app(app)
+    throttle.init_app(app)
+    cache.init_app(app)
+    invalidation.init_app(app)
+    replicas.init_app(app)
 
     app.register_blueprint(books_bp)
     app.register_blueprint(users_bp)
@@ -26,6 +47,12 @@ def create_app():
     # Initialize Swagger
     swagger.init_app(app)
 
+    instrumentation.init_app(app)
+    # Registered after instrumentation so its after_request hook runs first
+    # and the timings include compressing the response
+    compression.init_app(app)
+    fines.init_app(app)
+
     @app.route("/", methods=["GET"])
     def greeting():
         return (
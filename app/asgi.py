@@ -0,0 +1,178 @@
+"""ASGI deployment mode with an async read path.
+
+    uvicorn --factory app.asgi:create_asgi_app
+
+GET requests for the endpoints in ASYNC_VIEWS run as coroutines on an
+`AsyncSession` over asyncpg, so a slow query holds a pooled connection but
+no thread, and one worker can keep many such requests in flight. Every
+other request goes to the regular Flask app on a thread pool, through
+asgiref's WsgiToAsgi.
+
+Both paths share one Flask app: its config, caches, JWT and error
+handlers, and before/after request hooks. The async views reuse the
+blueprints' statements and renderers, so a response is the same whichever
+path served it.
+"""
+
+import io
+import sys
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.exceptions import HTTPException
+
+from app import async_db, create_app
+from app.routes import admin_routes, books_routes, users_routes
+
+# Flask endpoint -> coroutine serving its GET requests
+ASYNC_VIEWS = {
+    "books.get_all_books": books_routes.get_all_books_async,
+    "books.get_single_book": books_routes.get_single_book_async,
+    "users.get_borrowed_books": users_routes.get_borrowed_books_async,
+    "users.view_outstanding_fines": users_routes.view_outstanding_fines_async,
+    "admin.view_all_users": admin_routes.view_all_users_async,
+    "admin.view_all_borrowed_books": admin_routes.view_all_borrowed_books_async,
+}
+
+
+class _ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI request on one shared thread by default, which
+    # would serialize all writes; run each on the event loop's thread pool
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False
+    )
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that serves concurrent requests from a thread pool."""
+
+    async def __call__(self, scope, receive, send):
+        instance = _ThreadedWsgiToAsgiInstance(
+            self.wsgi_application, self.duplicate_header_limit
+        )
+        await instance(scope, receive, send)
+
+
+def _environ(scope):
+    """Build the WSGI environ of a bodyless request from its ASGI scope."""
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name) :]
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin1")
+        if name == "content-length":
+            key = "CONTENT_LENGTH"
+        elif name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncReadApp:
+    """Dispatches ASYNC_VIEWS on the event loop and the rest to Flask."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = ThreadedWsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            environ = _environ(scope)
+            try:
+                endpoint, view_args = self.flask_app.url_map.bind_to_environ(
+                    environ
+                ).match()
+            except HTTPException:
+                # 404s, 405s and slash redirects are rendered by Flask
+                endpoint = None
+            view = ASYNC_VIEWS.get(endpoint)
+            if view is not None:
+                return await self._dispatch(view, view_args, environ, send)
+
+        await self.wsgi(scope, receive, send)
+
+    async def _dispatch(self, view, view_args, environ, send):
+        # Mirrors Flask.wsgi_app() and full_dispatch_request(), awaiting the
+        # view; the request context lives in this task's contextvars
+        app = self.flask_app
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+
+            headers = response.get_wsgi_headers(environ)
+            body = b"".join(response.get_app_iter(environ))
+            response.close()
+        finally:
+            ctx.pop(error)
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in headers.items()
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def aclose(self):
+        """Close the async engine's pooled connections."""
+        await self.flask_app.extensions["async_engine"].dispose()
+
+
+def create_asgi_app():
+    app = create_app()
+    async_db.init_app(app)
+    return AsyncReadApp(app)
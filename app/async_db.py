@@ -0,0 +1,45 @@
+"""The asyncpg engine behind the async read path served by app.asgi.
+
+Only set up by create_asgi_app(); the WSGI app never imports an async
+driver.
+"""
+
+from flask import current_app
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import instrumentation
+from app.pool import InstrumentedAsyncAdaptedQueuePool
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+
+
+def init_app(app):
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).set(drivername=ASYNC_DRIVER)
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=app.config["ASYNC_POOL_SIZE"],
+        max_overflow=app.config["ASYNC_MAX_OVERFLOW"],
+        pool_timeout=app.config["DB_POOL_TIMEOUT"],
+        pool_recycle=app.config["DB_POOL_RECYCLE"],
+        pool_pre_ping=app.config["DB_POOL_PRE_PING"],
+        connect_args={
+            "server_settings": {
+                "application_name": app.config["DB_APPLICATION_NAME"],
+                "statement_timeout": str(app.config["DB_STATEMENT_TIMEOUT"]),
+            }
+        },
+    )
+    if app.config["INSTRUMENTATION_ENABLED"]:
+        instrumentation.instrument_engine(engine.sync_engine)
+
+    app.extensions["async_engine"] = engine
+    app.extensions["async_sessionmaker"] = async_sessionmaker(
+        engine, expire_on_commit=False
+    )
+
+
+def async_session():
+    """A new `AsyncSession`; use it as `async with async_session() as session`."""
+    return current_app.extensions["async_sessionmaker"]()
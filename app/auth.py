@@ -0,0 +1,112 @@
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.invalidation import notify_invalidation
+from app.models import User, db
+
+
+def role_claims(user):
+    """Additional JWT claims describing the user's role at login time."""
+    return {"is_admin": bool(user.is_admin), "role_version": user.role_version}
+
+
+# Returned by RoleVersionCache.cached() on a miss; None is a valid version
+# lookup result for a deleted user
+MISSING = object()
+
+
+def role_version_statement(user_id):
+    return select(User.role_version).where(User.id == user_id)
+
+
+class RoleVersionCache:
+    """Per-process cache of each user's current `role_version`.
+
+    Lets admin_required validate the role carried in a token without a
+    database round trip on every request. Entries expire after `ttl` seconds,
+    which bounds how long a revoked role keeps working in other processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        version = self.cached(user_id)
+        if version is not MISSING:
+            return version
+
+        with Session(db.engine) as session:
+            version = session.scalar(role_version_statement(user_id))
+        self.store(user_id, version)
+        return version
+
+    def cached(self, user_id):
+        """Return the cached version, or MISSING without querying."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return MISSING
+
+    def store(self, user_id, version):
+        with self._lock:
+            self._entries[user_id] = (version, time.monotonic() + self.ttl)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_role_changes(session, flush_context):
+    """Evict users whose `role_version` changed (User.set_admin) everywhere.
+
+    The NOTIFY goes out with the transaction, so other processes stop
+    accepting tokens with the old role as soon as the change commits.
+    """
+    user_ids = [
+        user.id
+        for user in session.dirty
+        if isinstance(user, User)
+        and inspect(user).attrs.role_version.history.has_changes()
+    ]
+    if user_ids:
+        notify_invalidation(session, "role_versions", user_ids)
+        session.info.setdefault("changed_roles", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_roles(session):
+    user_ids = session.info.pop("changed_roles", None)
+    if user_ids and has_app_context():
+        current_app.extensions["role_versions"].invalidate(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_roles(session):
+    session.info.pop("changed_roles", None)
+
+
+def init_app(app):
+    app.extensions["role_versions"] = RoleVersionCache(
+        app.config["ROLE_VERSION_CACHE_TTL"]
+    )
+
+
+def current_role_version(user_id):
+    return current_app.extensions["role_versions"].get(user_id)
+
+
+def invalidate_role(user_id):
+    current_app.extensions["role_versions"].invalidate(user_id)
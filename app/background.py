@@ -0,0 +1,52 @@
+"""Per-process background threads that survive forking app servers."""
+
+import os
+import threading
+
+
+class BackgroundThread:
+    """Runs `_run()` on a daemon thread in every process that uses it.
+
+    Threads do not survive a fork (e.g. gunicorn --preload), so
+    ensure_running(), registered as a before_request hook, starts the
+    thread again in each worker on its first request. `_run()` should loop
+    until `self._stop` is set, sleeping with `self._stop.wait()`.
+    """
+
+    thread_name = None
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name=self.thread_name, daemon=True
+        )
+        self._thread.start()
+
+    def ensure_running(self):
+        if self._pid == os.getpid() or self._stop.is_set():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _wake(self):
+        """Interrupt a `_run()` blocked on something other than `_stop`."""
+
+    def _run(self):
+        raise NotImplementedError
+
+    def init_app(self, app):
+        app.before_request(self.ensure_running)
+        self.start()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TTLCache:
+    """A bounded, thread-safe LRU cache whose entries also expire.
+
+    Holds at most `max_entries` values (0 disables caching), evicting the
+    least recently used one when full, and treats entries older than `ttl`
+    seconds as misses. The TTL bounds how long another process's writes can
+    go unnoticed; writes made in this process call invalidate().
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    @property
+    def generation(self):
+        """Changes on every invalidation; pass it back to set()."""
+        return self._generation
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation=None):
+        """Store `value` unless an invalidation happened since `generation`.
+
+        A reader takes the generation before querying the database, so a
+        value read just before a concurrent write commits is never cached
+        after that write's invalidation.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def init_app(app):
+    app.extensions["book_cache"] = TTLCache(
+        app.config["BOOK_CACHE_MAX_ENTRIES"], app.config["BOOK_CACHE_TTL"]
+    )
+
+
+def book_cache():
+    return current_app.extensions["book_cache"]
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.invalidation import notify_invalidation
+from app.models import CatalogVersion
+from app.replicas import CATALOG, pin_to_primary
+
+# The only row in catalog_version
+CATALOG_VERSION_ID = 1
+
+
+def bump_catalog_version(session):
+    """Record that the catalog changed; call inside the writing transaction.
+
+    The upsert creates the row on first use and otherwise serializes
+    concurrent writers on it, so every committed change gets its own version.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = insert(CatalogVersion).values(
+        id=CATALOG_VERSION_ID, version=1, updated_at=now
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CatalogVersion.id],
+            set_={
+                "version": CatalogVersion.version + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
+
+
+def record_catalog_change(session, book_ids):
+    """Bump the catalog version and tell every process to drop `book_ids`.
+
+    Both take effect when the caller's transaction commits; the caller still
+    invalidates its own process's cache right after committing. Catalog
+    reads stay on the primary until the replicas have the change.
+    """
+    bump_catalog_version(session)
+    notify_invalidation(session, "books", book_ids)
+    pin_to_primary(session, CATALOG)
+
+
+def _catalog_version_statement():
+    return select(CatalogVersion.version, CatalogVersion.updated_at).where(
+        CatalogVersion.id == CATALOG_VERSION_ID
+    )
+
+
+def _as_version(row):
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def read_catalog_version():
+    """Return `(version, updated_at)`; `(0, None)` before the first write.
+
+    A step of a read (see app.reads): `yield from read_catalog_version()`.
+    """
+    return _as_version((yield _catalog_version_statement()).first())
@@ -0,0 +1,179 @@
+"""Accept-Encoding negotiated compression of responses.
+
+Text responses (JSON, NDJSON, CSV, ...) of at least COMPRESSION_MIN_SIZE
+bytes are compressed with the best coding the client accepts: zstd, then
+brotli, then gzip. zstd and brotli need the `compression` extra (the
+zstandard and brotli packages); gzip is always available. Streamed
+responses are compressed chunk by chunk, each chunk flushed so the client
+still receives the stream as it is produced. Responses that already carry
+a Content-Encoding, or whose type is compressed by nature, pass through.
+
+A compressed body is a different representation from the identity one, so
+a strong ETag on it is made weak, on the 304s a client that accepts the
+coding gets too; the conditional request checks compare ETags weakly and
+keep answering 304. The app's own validators are weak to begin with (see
+app.conditional).
+"""
+
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional extra
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encoders(config):
+    """Content codings this process can produce, most preferred first."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda: ZstdEncoder(config["COMPRESSION_ZSTD_LEVEL"])
+    if brotli is not None:
+        encoders["br"] = lambda: BrotliEncoder(config["COMPRESSION_BROTLI_QUALITY"])
+    encoders["gzip"] = lambda: GzipEncoder(config["COMPRESSION_GZIP_LEVEL"])
+    return encoders
+
+
+def _is_compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def negotiate(accept_encodings, encoders):
+    """The coding to respond with, or None for the identity encoding.
+
+    The client's highest quality wins; ties go to our preference order.
+    """
+    best, best_quality = None, 0
+    for name in encoders:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _compress_stream(chunks, encoder):
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+class Compressor:
+    def __init__(self, app):
+        self.encoders = available_encoders(app.config)
+        self.min_size = app.config["COMPRESSION_MIN_SIZE"]
+
+    def after_request(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206)
+            or "Content-Encoding" in response.headers
+            or response.direct_passthrough
+            or not _is_compressible(response)
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        coding = negotiate(request.accept_encodings, self.encoders)
+        if coding is None:
+            return response
+        if response.status_code == 304:
+            _weaken_etag(response)
+            return response
+
+        if response.is_streamed:
+            encoder = self.encoders[coding]()
+            response.response = _compress_stream(response.iter_encoded(), encoder)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            encoder = self.encoders[coding]()
+            response.set_data(encoder.compress(body) + encoder.finish())
+
+        response.headers["Content-Encoding"] = coding
+        _weaken_etag(response)
+        return response
+
+
+def init_app(app):
+    """Compress responses if COMPRESSION_ENABLED."""
+    if not app.config["COMPRESSION_ENABLED"]:
+        return
+
+    compressor = Compressor(app)
+    app.extensions["compressor"] = compressor
+    app.after_request(compressor.after_request)
@@ -0,0 +1,41 @@
+from datetime import timezone
+
+from flask import Response, request
+
+
+def _http_date(value):
+    # Timestamps are stored as naive UTC; HTTP dates have second precision
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    """Evaluate the request's conditional headers against these validators.
+
+    If-Modified-Since is only consulted when If-None-Match is absent
+    (RFC 9110, section 13.2.2).
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach a weak ETag and Last-Modified, and ask caches to revalidate.
+
+    The ETags name a version of the data, not the bytes of one encoding of
+    it, so they are weak: the identity and the compressed responses (see
+    app.compression) and the 304s all carry the same one.
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return set_validators(Response(status=304), etag, last_modified)
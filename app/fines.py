@@ -0,0 +1,230 @@
+import logging
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.background import BackgroundThread
+from app.models import FineBalance, FineLedgerEntry, db
+
+logger = logging.getLogger("app.fines")
+
+FINE_RATE_PER_DAY = 2.0
+BORROWING_PERIOD_DAYS = 7
+
+ASSESSMENT = "assessment"
+PAYMENT = "payment"
+
+# pg_try_advisory_lock key held while accruing, so overlapping runs from the
+# CLI and the scheduler in every app process never double count
+ACCRUAL_LOCK_ID = 0x66696E65
+
+
+def to_cents(amount):
+    return int(round((amount or 0) * 100))
+
+
+def _post(session, borrow, kind, amount_cents):
+    """Append a ledger entry and move the user's balance by `amount_cents`.
+
+    The balance is bumped with a single upsert so concurrent postings for
+    the same user serialize on its row instead of overwriting each other.
+    Both writes commit (or roll back) with the caller's transaction.
+    """
+    now = datetime.now(timezone.utc)
+    session.add(
+        FineLedgerEntry(
+            user_id=borrow.user_id,
+            borrow_id=borrow.id,
+            book_id=borrow.book_id,
+            kind=kind,
+            amount_cents=amount_cents,
+            created_at=now,
+        )
+    )
+
+    stmt = insert(FineBalance).values(
+        user_id=borrow.user_id, balance_cents=amount_cents, updated_at=now
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[FineBalance.user_id],
+            set_={
+                "balance_cents": FineBalance.balance_cents
+                + stmt.excluded.balance_cents,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    )
+
+    borrow.overdue_fine = (to_cents(borrow.overdue_fine) + amount_cents) / 100
+
+
+def assess_fine(session, borrow, amount_cents):
+    """Charge `amount_cents` to the borrower for an overdue `borrow`."""
+    borrow.assessed_fine_cents = (borrow.assessed_fine_cents or 0) + amount_cents
+    _post(session, borrow, ASSESSMENT, amount_cents)
+
+
+def record_payment(session, borrow, amount_cents):
+    """Credit a payment of `amount_cents` against the fine on `borrow`."""
+    _post(session, borrow, PAYMENT, -amount_cents)
+
+
+# One chunk of accrual. `due` walks the open borrows in book_id order through
+# the partial unique index ix_borrows_open_book_id and works out the fine each
+# should carry by `now`. The UPDATE then raises assessed_fine_cents to that
+# figure, and the rows it changed are posted to the ledger and the balances.
+# All of this happens in the same statement. The UPDATE only touches rows
+# still open and unchanged since `due` read them. Anything returned or
+# accrued concurrently is left for the next run, and a rerun at the same
+# `now` finds nothing to do.
+ACCRUE_CHUNK = text(
+    """
+    WITH due AS (
+        SELECT id, book_id, assessed_fine_cents,
+               (floor(extract(epoch FROM :now - borrow_date) / 86400)::int
+                - :period_days) * :rate_cents AS fine_cents
+        FROM borrows
+        WHERE return_date IS NULL AND book_id > :after
+        ORDER BY book_id
+        LIMIT :batch_size
+    ),
+    accrued AS (
+        UPDATE borrows
+        SET assessed_fine_cents = due.fine_cents,
+            overdue_fine = (round(borrows.overdue_fine * 100)
+                            + due.fine_cents - due.assessed_fine_cents) / 100.0
+        FROM due
+        WHERE borrows.id = due.id
+          AND due.fine_cents > due.assessed_fine_cents
+          AND borrows.return_date IS NULL
+          AND borrows.assessed_fine_cents = due.assessed_fine_cents
+        RETURNING borrows.id, borrows.user_id, borrows.book_id,
+                  due.fine_cents - due.assessed_fine_cents AS delta_cents
+    ),
+    ledger AS (
+        INSERT INTO fine_ledger
+            (user_id, borrow_id, book_id, kind, amount_cents, created_at)
+        SELECT user_id, id, book_id, 'assessment', delta_cents, :now
+        FROM accrued
+    ),
+    balances AS (
+        INSERT INTO fine_balances (user_id, balance_cents, updated_at)
+        SELECT user_id, sum(delta_cents), :now FROM accrued GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET balance_cents = fine_balances.balance_cents
+                            + excluded.balance_cents,
+            updated_at = excluded.updated_at
+    )
+    SELECT (SELECT max(book_id) FROM due) AS last_book_id,
+           (SELECT count(*) FROM accrued) AS borrows,
+           (SELECT coalesce(sum(delta_cents), 0) FROM accrued) AS amount_cents
+    """
+)
+
+
+def accrue_fines(connection, now=None, batch_size=10_000):
+    """Bring the fines on every open overdue borrow up to date as of `now`.
+
+    Works through the open borrows `batch_size` at a time and commits after
+    each chunk, so locks are short-lived and an interrupted run keeps its
+    progress. Returns `(borrows, amount_cents)` newly assessed.
+    """
+    now = now or datetime.now(timezone.utc)
+    params = {
+        # borrow_date is stored as naive UTC
+        "now": now.astimezone(timezone.utc).replace(tzinfo=None),
+        "period_days": BORROWING_PERIOD_DAYS,
+        "rate_cents": to_cents(FINE_RATE_PER_DAY),
+        "batch_size": batch_size,
+        "after": 0,
+    }
+
+    total_borrows = total_cents = 0
+    while True:
+        row = connection.execute(ACCRUE_CHUNK, params).one()
+        connection.commit()
+        if row.last_book_id is None:
+            break
+        params["after"] = row.last_book_id
+        total_borrows += row.borrows
+        total_cents += row.amount_cents
+
+    return total_borrows, int(total_cents)
+
+
+def run_accrual(engine, now=None, batch_size=10_000):
+    """Run accrue_fines() unless another process already is.
+
+    Returns None when the advisory lock is held elsewhere.
+    """
+    with engine.connect() as connection:
+        locked = connection.scalar(select(func.pg_try_advisory_lock(ACCRUAL_LOCK_ID)))
+        connection.commit()
+        if not locked:
+            return None
+        try:
+            return accrue_fines(connection, now, batch_size)
+        finally:
+            connection.rollback()
+            connection.execute(select(func.pg_advisory_unlock(ACCRUAL_LOCK_ID)))
+            connection.commit()
+
+
+fines_cli = AppGroup("fines", help="Manage overdue fines.")
+
+
+@fines_cli.command("accrue")
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Open borrows updated per transaction.",
+)
+def accrue_command(batch_size):
+    """Assess fines accrued so far on books that are still out and overdue."""
+    result = run_accrual(
+        db.engine,
+        batch_size=batch_size or current_app.config["FINE_ACCRUAL_BATCH_SIZE"],
+    )
+    if result is None:
+        raise click.ClickException("Fine accrual is already running")
+    borrows, amount_cents = result
+    click.echo(f"Accrued ${amount_cents / 100:.2f} in fines on {borrows} borrows")
+
+
+class FineAccrualScheduler(BackgroundThread):
+    """Runs the accrual every FINE_ACCRUAL_INTERVAL seconds in this process."""
+
+    thread_name = "fine-accrual"
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+    def _run(self):
+        interval = self.app.config["FINE_ACCRUAL_INTERVAL"]
+        while not self._stop.wait(interval):
+            try:
+                with self.app.app_context():
+                    result = run_accrual(
+                        db.engine, batch_size=self.app.config["FINE_ACCRUAL_BATCH_SIZE"]
+                    )
+                if result is not None:
+                    logger.info("Accrued %d cents on %d borrows", result[1], result[0])
+            except Exception:
+                logger.exception("Fine accrual failed")
+
+
+def init_app(app):
+    """Register `flask fines` and, if an interval is set, the scheduler."""
+    app.cli.add_command(fines_cli)
+
+    if app.config["FINE_ACCRUAL_INTERVAL"] > 0:
+        scheduler = FineAccrualScheduler(app)
+        app.extensions["fine_accrual"] = scheduler
+        scheduler.init_app(app)
@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+
+from flask import current_app, g, has_app_context, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+
+from app.models import db
+
+logger = logging.getLogger("app.instrumentation")
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+
+def _current_stats():
+    if not has_app_context():
+        return None
+    return g.get("request_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    start_times = (
+        context.connection.info.get("query_start_time") if context.connection else None
+    )
+    if start_times:
+        start_times.pop()
+
+
+class TimedJSONProvider(JSONProvider):
+    """Wraps the app's JSON provider and records time spent serializing."""
+
+    def __init__(self, app, provider):
+        super().__init__(app)
+        self._provider = provider
+
+    def _timed(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats = _current_stats()
+            if stats is not None:
+                stats.serialization_time += time.perf_counter() - start
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(self._provider.dumps, obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return self._provider.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        return self._timed(self._provider.response, *args, **kwargs)
+
+
+def _start_request():
+    g.request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = g.pop("request_stats", None)
+    if stats is None:
+        return response
+
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.db_time * 1000
+    serialization_ms = stats.serialization_time * 1000
+
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={db_ms:.2f};desc="queries={stats.queries}", '
+        f"serialize;dur={serialization_ms:.2f}, "
+        f"total;dur={total_ms:.2f}",
+    )
+
+    record = {
+        "event": "request",
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "queries": stats.queries,
+        "db_ms": round(db_ms, 2),
+        "serialize_ms": round(serialization_ms, 2),
+        "total_ms": round(total_ms, 2),
+    }
+    logger.info(json.dumps(record))
+
+    budget = current_app.config["INSTRUMENTATION_QUERY_BUDGETS"].get(
+        request.endpoint, current_app.config["INSTRUMENTATION_DEFAULT_QUERY_BUDGET"]
+    )
+    if budget is not None and stats.queries > budget:
+        logger.warning(
+            json.dumps({"event": "query_budget_exceeded", "budget": budget, **record})
+        )
+
+    return response
+
+
+def instrument_engine(engine):
+    """Count and time the queries `engine` runs on behalf of requests."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def init_app(app):
+    """Register query counting and Server-Timing headers if enabled."""
+    if not app.config["INSTRUMENTATION_ENABLED"]:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    app.json = TimedJSONProvider(app, app.json)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,130 @@
+"""Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers call notify_invalidation() inside their transaction; Postgres
+delivers the notification to every listening connection only if and when
+that transaction commits. Each app process runs an InvalidationListener
+thread that evicts the named keys from its own caches.
+"""
+
+import json
+import logging
+import os
+import select as select_module
+import threading
+
+from sqlalchemy import func, select
+
+from app.background import BackgroundThread
+from app.models import db
+
+logger = logging.getLogger("app.invalidation")
+
+CHANNEL = "cache_invalidation"
+
+# NOTIFY payloads are limited to 8000 bytes; past this many keys the whole
+# cache is flushed instead
+MAX_KEYS_PER_NOTIFICATION = 500
+
+# Cache name in a notification -> app.extensions key of the cache
+CACHES = {
+    "books": "book_cache",
+    "role_versions": "role_versions",
+    # Read-your-writes pins of the replica router (app.replicas)
+    "primary_pins": "replica_router",
+}
+
+
+def notify_invalidation(session, cache, keys):
+    """Queue an invalidation of `keys` in `cache`, sent when `session` commits."""
+    keys = list(keys)
+    if len(keys) > MAX_KEYS_PER_NOTIFICATION:
+        payload = {"cache": cache, "all": True}
+    else:
+        payload = {"cache": cache, "keys": keys}
+    session.execute(select(func.pg_notify(CHANNEL, json.dumps(payload))))
+
+
+class InvalidationListener(BackgroundThread):
+    """Evicts keys from this process's caches as other processes write.
+
+    Holds one connection outside the pool. While it is disconnected no
+    notifications arrive, so every (re)connect starts by flushing the
+    caches.
+    """
+
+    thread_name = "cache-invalidation"
+    poll_interval = 1.0
+    reconnect_delay = 2.0
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.ready = threading.Event()
+        # Written to by stop() to wake the listener out of select()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+
+    def _wake(self):
+        os.write(self._wakeup_write, b"x")
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                # Detached, so the pool neither counts nor recycles it
+                connection.detach()
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+
+                self._flush_all()
+                self.ready.set()
+                self._listen(dbapi_connection)
+            except Exception:
+                logger.exception("Cache invalidation listener failed; reconnecting")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                self.ready.clear()
+                if connection is not None:
+                    connection.close()
+
+    def _listen(self, dbapi_connection):
+        while not self._stop.is_set():
+            readable, _, _ = select_module.select(
+                [dbapi_connection, self._wakeup_read], [], [], self.poll_interval
+            )
+            if dbapi_connection not in readable:
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                self.handle(dbapi_connection.notifies.pop(0).payload)
+
+    def handle(self, payload):
+        try:
+            message = json.loads(payload)
+            cache = self.app.extensions[CACHES[message["cache"]]]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring invalid invalidation message %r", payload)
+            return
+
+        if message.get("all"):
+            cache.clear()
+        else:
+            cache.invalidate(*message.get("keys", ()))
+
+    def _flush_all(self):
+        for extension in CACHES.values():
+            if extension in self.app.extensions:
+                self.app.extensions[extension].clear()
+
+
+def init_app(app):
+    """Start the listener if CACHE_INVALIDATION_LISTENER is set."""
+    if not app.config["CACHE_INVALIDATION_LISTENER"]:
+        return
+
+    listener = InvalidationListener(app)
+    app.extensions["invalidation_listener"] = listener
+    listener.init_app(app)
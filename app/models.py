@@ -1,13 +1,29 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from app.passwords import hash_password, verify_password
 
 db = SQLAlchemy()
 
+# Title matches outrank author matches in search results
+BOOK_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B')"
+)
+
 
 class Book(db.Model):
     __tablename__ = "books"
+    __table_args__ = (
+        # Backs keyset pagination of the catalog ordered by title
+        db.Index("ix_books_title_id", "title", "id"),
+        db.Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # Back the `language` and `author` filters of the catalog
+        db.Index("ix_books_language_id", "language", "id"),
+        db.Index("ix_books_author_id", "author", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -17,11 +33,55 @@ class Book(db.Model):
     pages = db.Column(db.Integer, nullable=True)
     cover = db.Column(db.String(255), nullable=True)
     language = db.Column(db.String(50), nullable=False)
+    search_vector = db.deferred(
+        db.Column(TSVECTOR, db.Computed(BOOK_SEARCH_VECTOR, persisted=True))
+    )
+    # Incremented by the ORM on every UPDATE (and by the bulk upsert); with
+    # updated_at it forms the book's ETag and Last-Modified
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=db.text("timezone('utc', now())"),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Book {self.title}>"
 
 
+# Books without a published date sort before every dated book. The catalog
+# is sorted and range-filtered on this expression rather than on the
+# nullable column, so keyset pagination never compares NULLs, and it is
+# this expression that is indexed.
+UNKNOWN_PUBLISHED_DATE = date.min
+BOOK_PUBLISHED_ORDER = db.func.coalesce(
+    Book.published_date,
+    db.cast(db.literal_column(f"'{UNKNOWN_PUBLISHED_DATE.isoformat()}'"), db.Date),
+)
+db.Index("ix_books_published_order_id", BOOK_PUBLISHED_ORDER, Book.id)
+
+
+class CatalogVersion(db.Model):
+    """A single row bumped in the same transaction as every catalog write.
+
+    Lets the book list answer conditional requests from one primary key
+    lookup instead of scanning the books it would return.
+    """
+
+    __tablename__ = "catalog_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
+
+
 class User(db.Model):
     __tablename__ = "users"
 
@@ -30,12 +90,19 @@ class User(db.Model):
     email = db.Column(db.String(255), nullable=False, unique=True)
     password_hash = db.Column(db.String(255), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)  # Add this line to the model
+    # Bumped on every role change so access tokens carrying an older role
+    # are rejected by admin_required
+    role_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def set_admin(self, is_admin):
+        self.is_admin = is_admin
+        self.role_version = (self.role_version or 0) + 1
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def __repr__(self):
         return f"<User {self.username}>"
@@ -43,6 +110,27 @@ class User(db.Model):
 
 class Borrow(db.Model):
     __tablename__ = "borrows"
+    __table_args__ = (
+        # A book can only have one open borrow; borrow_book relies on this to
+        # claim a book atomically with INSERT ... ON CONFLICT DO NOTHING
+        db.Index(
+            "ix_borrows_open_book_id",
+            "book_id",
+            unique=True,
+            postgresql_where=db.text("return_date IS NULL"),
+        ),
+        # A user's current loans (get_borrowed_books)
+        db.Index(
+            "ix_borrows_open_user_id",
+            "user_id",
+            "id",
+            postgresql_where=db.text("return_date IS NULL"),
+        ),
+        # Borrow history of a user for one book (pay_fine)
+        db.Index("ix_borrows_user_id_book_id", "user_id", "book_id"),
+        # Foreign key checks when a book is deleted
+        db.Index("ix_borrows_book_id", "book_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -52,9 +140,87 @@ class Borrow(db.Model):
     )
     return_date = db.Column(db.DateTime, nullable=True)
     overdue_fine = db.Column(db.Float, default=0.0)
+    # Total fines ever assessed on this borrow; accrual only posts the
+    # difference to what the borrow should carry by now
+    assessed_fine_cents = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
 
     user = db.relationship("User", backref="borrows", lazy=True)
     book = db.relationship("Book", backref="borrowed_by", lazy=True)
 
     def __repr__(self):
         return f"<Borrow user_id={self.user_id}, book_id={self.book_id}, borrow_date={self.borrow_date}, return_date={self.return_date}, overdue_fine={self.overdue_fine}>"
+
+
+class FineLedgerEntry(db.Model):
+    """An append-only record of a fine assessed or paid, in integer cents.
+
+    Assessments are positive and payments negative, so a user's entries sum
+    to their balance in `FineBalance`.
+    """
+
+    __tablename__ = "fine_ledger"
+    __table_args__ = (
+        # A user's itemized fines, in posting order (view_outstanding_fines)
+        db.Index("ix_fine_ledger_user_id_id", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # History outlives the borrow and book it refers to
+    borrow_id = db.Column(
+        db.Integer, db.ForeignKey("borrows.id", ondelete="SET NULL"), nullable=True
+    )
+    book_id = db.Column(
+        db.Integer, db.ForeignKey("books.id", ondelete="SET NULL"), nullable=True
+    )
+    kind = db.Column(db.String(20), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+    def __repr__(self):
+        return f"<FineLedgerEntry user_id={self.user_id}, kind={self.kind}, amount_cents={self.amount_cents}>"
+
+
+class FineBalance(db.Model):
+    """A user's outstanding fines, kept in step with `FineLedgerEntry`."""
+
+    __tablename__ = "fine_balances"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    balance_cents = db.Column(
+        db.BigInteger, nullable=False, default=0, server_default="0"
+    )
+    updated_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+    def __repr__(self):
+        return (
+            f"<FineBalance user_id={self.user_id}, balance_cents={self.balance_cents}>"
+        )
+
+
+class ThrottleBucket(db.Model):
+    """A login throttling token bucket, for the Postgres store of app.throttle.
+
+    Unlogged: a crash only resets the limits, and skipping the WAL keeps the
+    write made for every login attempt cheap.
+    """
+
+    __tablename__ = "throttle_buckets"
+    __table_args__ = (
+        # Pruning of buckets that have refilled
+        db.Index("ix_throttle_buckets_updated_at", "updated_at"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    key = db.Column(db.String(320), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ThrottleBucket {self.key} tokens={self.tokens}>"
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from flask import current_app, request, url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import tuple_
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when a `limit` or `cursor` query parameter cannot be honoured."""
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """A keyset sort order: one indexed column, tie-broken by the row id."""
+
+    name: str
+    column: Any
+    descending: bool = False
+    parse: Callable[[Any], Any] = lambda value: value
+    dump: Callable[[Any], Any] = lambda value: value
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="keyset-cursor")
+
+
+def encode_cursor(sort_key, row, direction):
+    payload = {
+        "s": sort_key.name,
+        "d": direction,
+        "k": [sort_key.dump(row._sort_value), row._id_value],
+    }
+    return _serializer().dumps(payload)
+
+
+def decode_cursor(token, sort_key):
+    try:
+        payload = _serializer().loads(token)
+        sort_value, row_id = payload["k"]
+        direction = payload["d"]
+    except (BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidPageRequest("Invalid cursor")
+
+    if payload.get("s") != sort_key.name or direction not in ("next", "prev"):
+        raise InvalidPageRequest("Cursor does not match the requested sort order")
+
+    return (sort_key.parse(sort_value), int(row_id)), direction
+
+
+def parse_limit(value):
+    """Validate the `limit` query parameter, clamping it to the server-side cap."""
+    if value is None:
+        return current_app.config["PAGINATION_DEFAULT_LIMIT"]
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidPageRequest("limit must be an integer")
+    if limit < 1:
+        raise InvalidPageRequest("limit must be a positive integer")
+    return min(limit, current_app.config["PAGINATION_MAX_LIMIT"])
+
+
+def keyset_statement(stmt, sort_key, id_column, cursor=None, limit=None):
+    """Apply the keyset predicate, ordering and LIMIT for one page to `stmt`.
+
+    The sort value and id are appended to the selected columns so the page
+    boundaries can be turned into cursors without knowing the row shape.
+    Returns the statement together with the fetch direction.
+    """
+    direction = "next"
+    stmt = stmt.add_columns(
+        sort_key.column.label("_sort_value"), id_column.label("_id_value")
+    )
+
+    # Walking backwards flips both the comparison and the ORDER BY; the rows
+    # are put back in display order by build_page().
+    descending = sort_key.descending
+    if cursor is not None:
+        values, direction = decode_cursor(cursor, sort_key)
+        if direction == "prev":
+            descending = not descending
+        boundary = tuple_(sort_key.column, id_column)
+        stmt = stmt.where(
+            boundary < tuple_(*values) if descending else boundary > tuple_(*values)
+        )
+
+    if descending:
+        stmt = stmt.order_by(sort_key.column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_key.column.asc(), id_column.asc())
+
+    return stmt.limit(limit + 1), direction
+
+
+def build_page(rows, sort_key, direction, limit, has_cursor):
+    """Turn the `limit + 1` rows fetched by keyset_statement() into a Page."""
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+
+    if direction == "prev":
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, has_cursor
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(sort_key, rows[-1], "next")
+    if rows and has_prev:
+        prev_cursor = encode_cursor(sort_key, rows[0], "prev")
+
+    return Page(items=rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def paginate(session, stmt, sort_key, id_column, cursor=None, limit=None):
+    page_stmt, direction = keyset_statement(stmt, sort_key, id_column, cursor, limit)
+    rows = session.execute(page_stmt).all()
+    return build_page(rows, sort_key, direction, limit, cursor is not None)
+
+
+def paginate_read(stmt, sort_key, id_column, cursor=None, limit=None):
+    """paginate() as a step of a read (see app.reads).
+
+    Used as `page = yield from paginate_read(...)`.
+    """
+    page_stmt, direction = keyset_statement(stmt, sort_key, id_column, cursor, limit)
+    rows = (yield page_stmt).all()
+    return build_page(rows, sort_key, direction, limit, cursor is not None)
+
+
+def link_header(page):
+    """Build an RFC 8288 `Link` header pointing at the neighbouring pages."""
+    links = []
+    for rel, cursor in (("next", page.next_cursor), ("prev", page.prev_cursor)):
+        if cursor is None:
+            continue
+        args = request.args.to_dict()
+        args["cursor"] = cursor
+        url = url_for(request.endpoint, _external=True, **request.view_args, **args)
+        links.append(f'<{url}>; rel="{rel}"')
+    return ", ".join(links)
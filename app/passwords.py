@@ -0,0 +1,121 @@
+"""Password hashing off the request threads.
+
+Hashing is deliberately slow and holds the GIL, so a burst of logins
+computed inline would stall every other request on the worker. Hashes are
+computed in a pool of PASSWORD_HASH_WORKERS processes instead, and at most
+PASSWORD_HASH_MAX_PENDING of them may be queued or running per app
+process: beyond that hash_password() and verify_password() raise
+HashingBusy, which the endpoints answer with a 503, rather than letting the
+queue grow without bound.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+
+class HashingBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already pending."""
+
+
+def hash_method(method):
+    """The parameters `method` writes into a hash, defaults filled in.
+
+    "scrypt" becomes "scrypt:32768:8:1" and "pbkdf2" "pbkdf2:sha256:<n>", so
+    hashes can be compared with the configured method.
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2" and len(args) <= 2:
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid password hash method {method!r}")
+
+
+class PasswordHasher:
+    def __init__(self, method, workers, max_pending):
+        self.method = hash_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Started on first use, so each forked worker gets its own pool. The
+        # hashing processes are spawned rather than forked from a process
+        # running other threads.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy
+        try:
+            executor = self._get_executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A hashing process died; start a new pool on the next call
+                with self._lock:
+                    if self._executor is executor:
+                        self._pid = None
+                raise
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether `password_hash` was made with other parameters."""
+        return password_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._pid = None
+
+
+def hash_password(password):
+    return current_app.extensions["password_hasher"].hash(password)
+
+
+def verify_password(password_hash, password):
+    return current_app.extensions["password_hasher"].verify(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return current_app.extensions["password_hasher"].needs_rehash(password_hash)
+
+
+def init_app(app):
+    app.extensions["password_hasher"] = PasswordHasher(
+        app.config["PASSWORD_HASH_METHOD"],
+        app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_MAX_PENDING"],
+    )
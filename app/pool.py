@@ -0,0 +1,117 @@
+"""Connection pool telemetry.
+
+The engines' pools time every checkout, including the wait for a free
+connection when the pool is exhausted, so GET /admin/pool-stats can show
+whether a worker's pool is sized to its concurrency.
+"""
+
+import bisect
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (milliseconds) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class CheckoutStats:
+    """Checkout counts and a histogram of how long checkouts took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, seconds, timed_out=False):
+        bucket = bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._buckets[bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "mean": round(self.wait_total * 1000 / waits, 3) if waits else None,
+                    "max": round(self.wait_max * 1000, 3),
+                    # Non-cumulative; the last bucket ("le": null) is unbounded
+                    "histogram": [
+                        {"le": bound, "count": count}
+                        for bound, count in zip((*WAIT_BUCKETS_MS, None), self._buckets)
+                    ],
+                },
+            }
+
+
+class _TimedCheckout:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.checkout_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool that records how long each checkout took."""
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout took."""
+
+
+def pool_stats(engine):
+    """Live occupancy and checkout timings of `engine`'s pool."""
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative while fewer than `size` connections have been opened
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+    if isinstance(pool, _TimedCheckout):
+        stats.update(pool.checkout_stats.snapshot())
+    return stats
+
+
+def _with_instrumented_pool(options):
+    if not isinstance(options, dict):
+        options = {"url": options}
+    return {"poolclass": InstrumentedQueuePool, **options}
+
+
+def init_app(app):
+    """Use the instrumented pool for every engine that does not pick one.
+
+    Must run before db.init_app(), which creates the engines.
+    """
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = _with_instrumented_pool(
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    )
+    app.config["SQLALCHEMY_BINDS"] = {
+        key: _with_instrumented_pool(options)
+        for key, options in app.config["SQLALCHEMY_BINDS"].items()
+    }
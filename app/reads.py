@@ -0,0 +1,63 @@
+"""Read views written once for both the WSGI and the ASGI path.
+
+A read is a generator holding all of a view's logic: request parsing,
+validation, conditional requests and rendering. It yields each statement
+it needs, is sent back the Result, and returns the response. run_read()
+executes the statements on a Session and run_read_async() on an
+AsyncSession, so a sync view and its async twin differ only in the driver
+they call.
+
+The session is opened at the first statement, so requests rejected before
+touching the database never take a connection. A database error is raised
+inside the generator, at the yield, for the view's own error handling.
+"""
+
+from contextlib import AsyncExitStack, ExitStack
+
+from sqlalchemy.orm import Session
+
+from app.async_db import async_session
+
+
+def _open_options(isolation_level):
+    if isolation_level is None:
+        return {}
+    return {"execution_options": {"isolation_level": isolation_level}}
+
+
+def run_read(read, engine, isolation_level=None):
+    """Run `read` on a Session of `engine`; return its response."""
+    with ExitStack() as stack:
+        session = None
+        result = error = None
+        while True:
+            try:
+                statement = read.throw(error) if error else read.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                if session is None:
+                    session = stack.enter_context(Session(engine))
+                    session.connection(**_open_options(isolation_level))
+                result, error = session.execute(statement), None
+            except Exception as e:
+                result, error = None, e
+
+
+async def run_read_async(read, isolation_level=None):
+    """run_read() on the async pool (see app.asgi)."""
+    async with AsyncExitStack() as stack:
+        session = None
+        result = error = None
+        while True:
+            try:
+                statement = read.throw(error) if error else read.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                if session is None:
+                    session = await stack.enter_async_context(async_session())
+                    await session.connection(**_open_options(isolation_level))
+                result, error = await session.execute(statement), None
+            except Exception as e:
+                result, error = None, e
@@ -0,0 +1,276 @@
+"""Read-replica routing for GET endpoints.
+
+Read handlers take their engine from read_engine(), naming what they read:
+a user id, or CATALOG for books. They get a replica that the health check
+last found reachable and at most REPLICA_MAX_LAG seconds behind the
+primary, and the primary otherwise. Writes always use the primary, and
+call pin_to_primary() so that reads of what they changed stay on the
+primary for REPLICA_PIN_SECONDS, long enough for the replicas to catch up.
+
+A replica that fails under a request is taken out of rotation at once, and
+views decorated with replica_fallback are run again on the primary.
+"""
+
+import collections
+import functools
+import itertools
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from app.background import BackgroundThread
+from app.invalidation import notify_invalidation
+from app.models import db
+
+logger = logging.getLogger("app.replicas")
+
+REPLICA_BIND_PREFIX = "replica_"
+
+# Pin key for book and catalog reads; users are pinned by their id
+CATALOG = "catalog"
+
+# Seconds of replay lag; 0 once everything received has been replayed, or
+# on a server that is not a standby at all
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            AND EXISTS (
+                SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+            ) THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+            'Infinity'::float8
+        )
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        # Unused until the first health check passes
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+
+class ReplicaRouter(BackgroundThread):
+    """Picks the engine for each read and health-checks the replicas.
+
+    The checks run on a background thread, so a replica that stops
+    answering never holds up a request for more than the one query that
+    finds it gone.
+    """
+
+    thread_name = "replica-health-check"
+
+    def __init__(self, app, engines):
+        super().__init__()
+        self.app = app
+        self.replicas = [Replica(name, engine) for name, engine in engines.items()]
+        self.max_lag = app.config["REPLICA_MAX_LAG"]
+        self.check_interval = app.config["REPLICA_CHECK_INTERVAL"]
+        self.pin_seconds = app.config["REPLICA_PIN_SECONDS"]
+        self.checked = threading.Event()
+        self._round_robin = itertools.count()
+        self._pins = {}
+        # (until, key) of every pin in the order it was made, which is also
+        # the order the pins expire in as they all last pin_seconds
+        self._expiries = collections.deque()
+        self._pin_all_until = 0.0
+        self._lock = threading.Lock()
+
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    def engine_for(self, keys):
+        """A healthy replica's engine, or None if the primary must serve."""
+        if self.is_pinned(keys):
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._round_robin) % len(healthy)].engine
+
+    def pin(self, *keys):
+        now = time.monotonic()
+        until = now + self.pin_seconds
+        with self._lock:
+            # Drop expired pins as new ones arrive, so keys that are never
+            # read again do not accumulate for the life of the worker
+            while self._expiries and self._expiries[0][0] <= now:
+                expired, key = self._expiries.popleft()
+                if self._pins.get(key) == expired:
+                    del self._pins[key]
+            for key in keys:
+                self._pins[key] = until
+                self._expiries.append((until, key))
+
+    def is_pinned(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            if self._pin_all_until > now:
+                return True
+            for key in keys:
+                until = self._pins.get(key)
+                if until is None:
+                    continue
+                if until > now:
+                    return True
+                del self._pins[key]
+        return False
+
+    # Pins arrive from other processes as cache invalidations (see
+    # app.invalidation): the replicas' copy of the keys is stale for now
+    def invalidate(self, *keys):
+        self.pin(*keys)
+
+    def clear(self):
+        # Pins may have been missed while the listener was disconnected
+        with self._lock:
+            self._pins.clear()
+            self._expiries.clear()
+            self._pin_all_until = time.monotonic() + self.pin_seconds
+
+    def check(self, replica):
+        try:
+            with replica.engine.connect() as connection:
+                lag = connection.scalar(LAG_QUERY)
+        except SQLAlchemyError as e:
+            if replica.healthy or replica.checked_at is None:
+                logger.warning("Replica %s is unreachable: %s", replica.name, e)
+            replica.healthy = False
+            replica.lag = None
+            replica.error = type(e).__name__
+        else:
+            if lag > self.max_lag and replica.healthy:
+                logger.warning("Replica %s is %.1fs behind", replica.name, lag)
+            replica.healthy = lag <= self.max_lag
+            replica.lag = lag
+            replica.error = None
+        replica.checked_at = time.monotonic()
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+        self.checked.set()
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            # Stop routing to a replica as soon as a request loses it or
+            # cannot reach it, rather than at the next health check. Failed
+            # connects (refused, timed out) are not flagged as disconnects.
+            failed_connect = context.connection is None and isinstance(
+                context.sqlalchemy_exception, OperationalError
+            )
+            if context.is_disconnect or failed_connect:
+                replica.healthy = False
+                if has_app_context():
+                    g.replica_failed = True
+
+        return handle_error
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_all()
+            except Exception:
+                logger.exception("Replica health check failed")
+            self._stop.wait(self.check_interval)
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            replica.name: {
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag,
+                "error": replica.error,
+                "seconds_since_check": (
+                    round(now - replica.checked_at, 3)
+                    if replica.checked_at is not None
+                    else None
+                ),
+            }
+            for replica in self.replicas
+        }
+
+
+def read_engine(*keys):
+    """The engine a GET handler reads `keys` (user ids or CATALOG) from."""
+    router = current_app.extensions.get("replica_router")
+    if router is not None and not g.get("replica_failed"):
+        engine = router.engine_for(keys)
+        if engine is not None:
+            return engine
+    return db.engine
+
+
+def replica_fallback(view):
+    """Run a read-only view again on the primary if a replica fails under it.
+
+    Whether the failure surfaced as an exception or was turned into an
+    error response by the view, the view is run once more with every
+    read_engine() call of the request answered by the primary.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            response = view(*args, **kwargs)
+        except SQLAlchemyError:
+            if not g.get("replica_failed"):
+                raise
+        else:
+            if not g.get("replica_failed"):
+                return response
+        logger.warning(
+            "Replica failed during %s; retrying on the primary", view.__name__
+        )
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def pin_to_primary(session, *keys):
+    """Keep reads of `keys` on the primary while replicas catch up.
+
+    Call inside the writing transaction; other processes are told when it
+    commits, if CACHE_INVALIDATION_LISTENER is on.
+    """
+    router = current_app.extensions.get("replica_router")
+    if router is None:
+        return
+    router.pin(*keys)
+    if "invalidation_listener" in current_app.extensions:
+        notify_invalidation(session, "primary_pins", keys)
+
+
+def init_app(app):
+    """Route reads to the `replica_*` binds, if any are configured."""
+    with app.app_context():
+        engines = {
+            key: engine
+            for key, engine in db.engines.items()
+            if key and key.startswith(REPLICA_BIND_PREFIX)
+        }
+    if not engines:
+        return
+
+    # Flask-SQLAlchemy registers a metadata for every bind, which would make
+    # db.create_all() and drop_all() visit the replicas; they get the schema
+    # by replication
+    for key in engines:
+        db.metadatas.pop(key, None)
+
+    router = ReplicaRouter(app, engines)
+    app.extensions["replica_router"] = router
+    router.init_app(app)
@@ -1,10 +1,23 @@
 from functools import wraps
 
-from flask import Blueprint, jsonify
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import (
+    get_jwt,
+    get_jwt_identity,
+    jwt_required,
+    verify_jwt_in_request,
+)
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.async_db import async_session
+from app.auth import MISSING, current_role_version, role_version_statement
+from app.cache import book_cache
 from app.models import Book, Borrow, User, db
+from app.pool import pool_stats
+from app.reads import run_read, run_read_async
+from app.replicas import pin_to_primary, read_engine, replica_fallback
+from app.serializers import BORROW_FIELDS, USER_FIELDS, InvalidFieldset
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -16,64 +29,136 @@ def admin_required(fn):
     @jwt_required()
     def wrapper(*args, **kwargs):
         current_user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        if "role_version" in claims:
+            # The role travels in the token; only its version is checked,
+            # against a short-lived per-process cache
+            if not claims.get("is_admin") or (
+                current_role_version(current_user_id) != claims["role_version"]
+            ):
+                return jsonify({"error": "Forbidden: Admins only"}), 403
+
+            return fn(*args, **kwargs)
 
+        # Tokens issued before roles were carried in claims
         with Session(db.engine) as session:
             current_user = session.get(User, current_user_id)
 
             if not current_user or not getattr(current_user, "is_admin", False):
                 return jsonify({"error": "Forbidden: Admins only"}), 403
 
-            return fn(*args, **kwargs)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def admin_required_async(fn):
+    """admin_required for the async views served by app.asgi"""
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        current_user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        async with async_session() as session:
+            if "role_version" in claims:
+                role_versions = current_app.extensions["role_versions"]
+                role_version = role_versions.cached(current_user_id)
+                if role_version is MISSING:
+                    role_version = await session.scalar(
+                        role_version_statement(current_user_id)
+                    )
+                    role_versions.store(current_user_id, role_version)
+
+                if not claims.get("is_admin") or role_version != claims["role_version"]:
+                    return jsonify({"error": "Forbidden: Admins only"}), 403
+
+            else:
+                # Tokens issued before roles were carried in claims
+                current_user = await session.get(User, current_user_id)
+                if not current_user or not getattr(current_user, "is_admin", False):
+                    return jsonify({"error": "Forbidden: Admins only"}), 403
+
+        return await fn(*args, **kwargs)
 
     return wrapper
 
 
+def users_statement(fields=USER_FIELDS.all):
+    return select(*USER_FIELDS.columns(fields)).order_by(User.id)
+
+
+def render_users(all_users, fields):
+    serialize = USER_FIELDS.serializer(fields)
+    return jsonify({"users": serialize.many(all_users)}), 200
+
+
+def _all_users():
+    """GET /admin/users as a read (see app.reads)."""
+    try:
+        fields = USER_FIELDS.parse(request.args.get("fields"))
+    except InvalidFieldset as e:
+        return jsonify({"error": str(e)}), 400
+
+    all_users = (yield users_statement(fields)).all()
+    return render_users(all_users, fields)
+
+
 @admin_bp.route("/users", methods=["GET"])
 @admin_required
+@replica_fallback
 def view_all_users():
-    with Session(db.engine) as session:
-        # Retrieve all users
-        all_users = session.query(User).all()
-        users_list = [
-            {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "is_admin": user.is_admin,
-            }
-            for user in all_users
-        ]
+    return run_read(_all_users(), read_engine(get_jwt_identity()))
+
+
+@admin_required_async
+async def view_all_users_async():
+    """view_all_users() on the async read path (see app.asgi)."""
+    return await run_read_async(_all_users())
+
+
+def all_borrowed_books_statement(fields=BORROW_FIELDS.all):
+    # Project only the needed columns so usernames and titles come from the
+    # joins instead of one lazy load per row, and join only the tables the
+    # requested fields live in
+    stmt = select(*BORROW_FIELDS.columns(fields)).select_from(Borrow)
+    tables = BORROW_FIELDS.tables(fields)
+    if Book.__table__ in tables:
+        stmt = stmt.join(Book, Borrow.book_id == Book.id)
+    if User.__table__ in tables:
+        stmt = stmt.join(User, Borrow.user_id == User.id)
+    return stmt.order_by(Borrow.id)
+
+
+def render_all_borrowed_books(borrowed_books, fields):
+    serialize = BORROW_FIELDS.serializer(fields)
+    return jsonify({"borrowed_books": serialize.many(borrowed_books)}), 200
+
+
+def _all_borrowed_books():
+    """GET /admin/borrowed-books as a read (see app.reads)."""
+    try:
+        fields = BORROW_FIELDS.parse(request.args.get("fields"))
+    except InvalidFieldset as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify({"users": users_list}), 200
+    borrowed_books = (yield all_borrowed_books_statement(fields)).all()
+    return render_all_borrowed_books(borrowed_books, fields)
 
 
 @admin_bp.route("/borrowed-books", methods=["GET"])
 @admin_required
+@replica_fallback
 def view_all_borrowed_books():
-    with Session(db.engine) as session:
-        # Retrieve all borrowed books
-        borrowed_books = (
-            session.query(Borrow)
-            .join(Book, Borrow.book_id == Book.id)
-            .join(User, Borrow.user_id == User.id)
-            .all()
-        )
-
-        borrowed_books_list = [
-            {
-                "borrow_id": borrow.id,
-                "user_id": borrow.user_id,
-                "username": borrow.user.username,
-                "book_id": borrow.book_id,
-                "book_title": borrow.book.title,
-                "borrow_date": borrow.borrow_date,
-                "return_date": borrow.return_date,
-                "overdue_fine": borrow.overdue_fine,
-            }
-            for borrow in borrowed_books
-        ]
-
-        return jsonify({"borrowed_books": borrowed_books_list}), 200
+    return run_read(_all_borrowed_books(), read_engine(get_jwt_identity()))
+
+
+@admin_required_async
+async def view_all_borrowed_books_async():
+    """view_all_borrowed_books() on the async read path (see app.asgi)."""
+    return await run_read_async(_all_borrowed_books())
 
 
 @admin_bp.route("/borrow/<int:borrow_id>", methods=["DELETE"])
@@ -86,6 +171,31 @@ def delete_borrow_record(borrow_id):
             return jsonify({"error": "Borrow record not found"}), 404
 
         session.delete(borrow_record)
+        pin_to_primary(session, borrow_record.user_id, get_jwt_identity())
         session.commit()
 
     return "", 204  # No content
+
+
+@admin_bp.route("/cache-stats", methods=["GET"])
+@admin_required
+def view_cache_stats():
+    # Counters are per process; each worker reports its own
+    return jsonify({"book_cache": book_cache().stats()}), 200
+
+
+@admin_bp.route("/pool-stats", methods=["GET"])
+@admin_required
+def view_pool_stats():
+    # Pools are per process; each worker reports its own
+    pools = {
+        bind_key or "default": pool_stats(engine)
+        for bind_key, engine in db.engines.items()
+    }
+    if "async_engine" in current_app.extensions:
+        pools["async"] = pool_stats(current_app.extensions["async_engine"].sync_engine)
+
+    stats = {"pools": pools}
+    if "replica_router" in current_app.extensions:
+        stats["replicas"] = current_app.extensions["replica_router"].stats()
+    return jsonify(stats), 200
@@ -1,15 +1,107 @@
-from datetime import datetime, timezone
-
-from flask import Blueprint, jsonify, request
+import csv
+import hashlib
+import io
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
 from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import DateTime, Float, cast, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-
-from app.models import Book, Borrow, db
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.cache import book_cache
+from app.catalog import read_catalog_version, record_catalog_change
+from app.conditional import is_not_modified, not_modified, set_validators
+from app.fines import BORROWING_PERIOD_DAYS, FINE_RATE_PER_DAY, assess_fine, to_cents
+from app.models import BOOK_PUBLISHED_ORDER, UNKNOWN_PUBLISHED_DATE, Book, Borrow, db
+from app.pagination import (
+    InvalidPageRequest,
+    SortKey,
+    link_header,
+    paginate,
+    paginate_read,
+    parse_limit,
+)
+from app.reads import run_read, run_read_async
+from app.replicas import CATALOG, pin_to_primary, read_engine, replica_fallback
+from app.serializers import BOOK_FIELDS, InvalidFieldset, serialize_book
 
 books_bp = Blueprint("books", __name__, url_prefix="/books")
 
-FINE_RATE_PER_DAY = 2.0
-BORROWING_PERIOD_DAYS = 7
+logger = logging.getLogger("app.books")
+
+# Orders accepted by `GET /books/?sort=`; each one is backed by an index
+# ending in `id` so every page is an index range scan.
+BOOK_SORT_KEYS = {
+    "id": SortKey("id", Book.id),
+    "-id": SortKey("-id", Book.id, descending=True),
+    "title": SortKey("title", Book.title),
+    "-title": SortKey("-title", Book.title, descending=True),
+    "published_date": SortKey(
+        "published_date",
+        BOOK_PUBLISHED_ORDER,
+        parse=date.fromisoformat,
+        dump=date.isoformat,
+    ),
+    "-published_date": SortKey(
+        "-published_date",
+        BOOK_PUBLISHED_ORDER,
+        descending=True,
+        parse=date.fromisoformat,
+        dump=date.isoformat,
+    ),
+}
+
+
+class InvalidBookFilter(ValueError):
+    """Raised when a `GET /books/` filter has a value it cannot take."""
+
+
+def _date_filter(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise InvalidBookFilter(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def book_filters(args):
+    """The WHERE clauses for the filters `GET /books/` accepts.
+
+    `language` and `author` match exactly and are served by their
+    (column, id) indexes; the inclusive `published_from`/`published_to`
+    range is a range scan of ix_books_published_order_id, so it is
+    expressed on BOOK_PUBLISHED_ORDER and leaves out undated books.
+    """
+    clauses = [
+        column == args[name]
+        for name, column in (("language", Book.language), ("author", Book.author))
+        if name in args
+    ]
+
+    published_from = _date_filter(args, "published_from")
+    published_to = _date_filter(args, "published_to")
+    if published_from is not None or published_to is not None:
+        clauses.append(BOOK_PUBLISHED_ORDER > UNKNOWN_PUBLISHED_DATE)
+    if published_from is not None:
+        clauses.append(BOOK_PUBLISHED_ORDER >= published_from)
+    if published_to is not None:
+        clauses.append(BOOK_PUBLISHED_ORDER <= published_to)
+    return clauses
 
 
 @books_bp.route("/", methods=["POST"])
@@ -27,75 +119,417 @@ def create_book():
     )
 
     db.session.add(new_book)
+    db.session.flush()
+    record_catalog_change(db.session, [new_book.id])
     db.session.commit()
+    book_cache().invalidate(new_book.id)
 
     return (
-        jsonify(
-            {
-                "id": new_book.id,
-                "title": new_book.title,
-                "author": new_book.author,
-                "published_date": new_book.published_date,
-                "isbn": new_book.isbn,
-                "pages": new_book.pages,
-                "cover": new_book.cover,
-                "language": new_book.language,
-            }
-        ),
+        jsonify(serialize_book(new_book)),
         201,
     )
 
 
-@books_bp.route("/", methods=["GET"])
-def get_all_books():
+# Largest value a Postgres `integer` column holds
+INT4_MAX = 2**31 - 1
+
+# Fields of a bulk import row and whether each is required. Types and
+# lengths are checked against the Book columns, so a row that passes
+# validation always fits the table.
+BULK_BOOK_FIELDS = {
+    "title": True,
+    "author": True,
+    "language": True,
+    "published_date": False,
+    "isbn": False,
+    "pages": False,
+    "cover": False,
+}
+
+
+def _validate_bulk_row(data):
+    """Return `(row, None)` for a valid book object or `(None, error)`."""
+    if not isinstance(data, dict):
+        return None, "Row must be a JSON object"
+
+    row = {}
+    for field, required in BULK_BOOK_FIELDS.items():
+        value = data.get(field)
+        if value is None:
+            if required:
+                return None, f"'{field}' is required"
+            row[field] = None
+            continue
+
+        column_type = Book.__table__.c[field].type
+        if isinstance(column_type, db.Date):
+            try:
+                value = date.fromisoformat(value)
+            except (TypeError, ValueError):
+                return None, f"'{field}' must be an ISO 8601 date"
+        elif isinstance(column_type, db.Integer):
+            if (
+                not isinstance(value, int)
+                or isinstance(value, bool)
+                or not 0 <= value <= INT4_MAX
+            ):
+                return None, f"'{field}' must be an integer from 0 to {INT4_MAX}"
+        elif not isinstance(value, str) or not value.strip():
+            return None, f"'{field}' must be a non-empty string"
+        elif "\x00" in value:
+            return None, f"'{field}' must not contain NUL characters"
+        elif len(value) > column_type.length:
+            return None, f"'{field}' must be at most {column_type.length} characters"
+
+        row[field] = value
+    return row, None
+
+
+def _bulk_source():
+    """Yield `(index, parsed object or None)` from a JSON array or NDJSON body."""
+    if request.mimetype == "application/x-ndjson":
+        # Read the stream line by line so large feeds are never fully buffered
+        index = 0
+        for line in io.BufferedReader(request.stream, buffer_size=1 << 16):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, None
+            index += 1
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Body must be a JSON array or an NDJSON stream")
+    yield from enumerate(data)
+
+
+def _upsert_statement():
+    stmt = insert(Book.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[Book.isbn],
+        set_={
+            **{field: stmt.excluded[field] for field in BULK_BOOK_FIELDS},
+            "version": Book.__table__.c.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(Book.__table__.c.id, literal_column("xmax = 0").label("inserted"))
+
+
+BULK_UPSERT = _upsert_statement()
+
+
+def _upsert_books(session, batch):
+    """Write one batch with a multi-row INSERT ... ON CONFLICT (isbn) DO UPDATE.
+
+    The statement is compiled once and executed with "insertmanyvalues", so
+    each batch goes to the server as a single multi-row VALUES statement.
+    Returns the number of inserted and updated rows.
+    """
+    rows = session.connection().execute(BULK_UPSERT, batch).all()
+    inserted = sum(1 for row in rows if row.inserted)
+    record_catalog_change(session, [row.id for row in rows])
+    session.commit()
+    book_cache().invalidate(*(row.id for row in rows))
+    return inserted, len(batch) - inserted
+
+
+@books_bp.route("/bulk", methods=["POST"])
+def bulk_create_books():
+    batch_size = current_app.config["BULK_INSERT_BATCH_SIZE"]
+    created = updated = 0
+    errors = []
+    batch, batch_indexes, batch_isbns = [], [], set()
+
+    def flush(session):
+        nonlocal created, updated
+        if not batch:
+            return
+        try:
+            inserted, changed = _upsert_books(session, batch)
+            created += inserted
+            updated += changed
+        except SQLAlchemyError:
+            session.rollback()
+            # Store the rows one at a time so only the failing ones are lost
+            for index, row in zip(batch_indexes, batch):
+                try:
+                    inserted, changed = _upsert_books(session, [row])
+                    created += inserted
+                    updated += changed
+                except SQLAlchemyError as e:
+                    session.rollback()
+                    # The exception text carries the statement and the
+                    # uploaded values, so only the driver error is logged
+                    logger.warning(
+                        "Bulk import row %d could not be stored: %s",
+                        index,
+                        type(getattr(e, "orig", None) or e).__name__,
+                    )
+                    errors.append({"index": index, "error": "Row could not be stored"})
+        batch.clear()
+        batch_indexes.clear()
+        batch_isbns.clear()
+
     try:
-        books = Book.query.all()
-        return (
-            jsonify(
-                [
-                    {
-                        "id": book.id,
-                        "title": book.title,
-                        "author": book.author,
-                        "published_date": book.published_date,
-                        "isbn": book.isbn,
-                        "pages": book.pages,
-                        "cover": book.cover,
-                        "language": book.language,
-                    }
-                    for book in books
-                ]
-            ),
-            200,
+        with Session(db.engine) as session:
+            for index, data in _bulk_source():
+                row, error = _validate_bulk_row(data)
+                if error:
+                    errors.append({"index": index, "error": error})
+                    continue
+
+                # One statement cannot touch the same row twice, so a repeated
+                # ISBN closes the batch and the later row wins.
+                if row["isbn"] is not None and row["isbn"] in batch_isbns:
+                    flush(session)
+                if row["isbn"] is not None:
+                    batch_isbns.add(row["isbn"])
+
+                batch.append(row)
+                batch_indexes.append(index)
+                if len(batch) >= batch_size:
+                    flush(session)
+            flush(session)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    errors.sort(key=lambda error: error["index"])
+    return jsonify({"created": created, "updated": updated, "errors": errors}), 200
+
+
+def _etag(*parts):
+    # updated_at is part of every ETag so that versions restarting from 1
+    # after the database is rebuilt cannot validate an old representation
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+
+
+def _catalog_etag(version, updated_at):
+    # Every page of every sort order is its own representation
+    return _etag("catalog", version, updated_at, sorted(request.args.items(multi=True)))
+
+
+def _book_etag(book_id, version, updated_at):
+    return _etag("book", book_id, version, updated_at)
+
+
+@dataclass(frozen=True)
+class CachedBook:
+    """A serialized `GET /books/<id>` response held in the book cache."""
+
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+    @classmethod
+    def from_book(cls, book):
+        return cls(
+            body=jsonify(serialize_book(book)).get_data(),
+            etag=_book_etag(book.id, book.version, book.updated_at),
+            last_modified=book.updated_at,
         )
+
+    def response(self):
+        response = current_app.response_class(self.body, mimetype="application/json")
+        return set_validators(response, self.etag, self.last_modified), 200
+
+
+def _list_books():
+    """GET /books/ as a read (see app.reads), run under REPEATABLE READ."""
+    sort_key = BOOK_SORT_KEYS.get(request.args.get("sort", "id"))
+    if sort_key is None:
+        return jsonify({"error": "Unsupported sort field"}), 400
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        fields = BOOK_FIELDS.parse(request.args.get("fields"))
+        filters = book_filters(request.args)
+
+        # One snapshot for the version and the page, so the ETag always
+        # describes the rows actually returned
+        version, updated_at = yield from read_catalog_version()
+        etag = _catalog_etag(version, updated_at)
+        if is_not_modified(etag, updated_at):
+            return not_modified(etag, updated_at)
+
+        page = yield from paginate_read(
+            select(*BOOK_FIELDS.columns(fields)).where(*filters),
+            sort_key,
+            Book.id,
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+    except (InvalidPageRequest, InvalidFieldset, InvalidBookFilter) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Log the error to the console
         print(f"Error retrieving books: {e}")
         return jsonify({"error": "An error occurred while retrieving books"}), 500
 
+    return render_book_list(page, fields, etag, updated_at)
 
-@books_bp.route("/<int:book_id>", methods=["GET"])
-def get_single_book(book_id):
-    with Session(db.engine) as session:
-        book = session.get(Book, book_id)
+
+@books_bp.route("/", methods=["GET"])
+@replica_fallback
+def get_all_books():
+    return run_read(_list_books(), read_engine(CATALOG), "REPEATABLE READ")
+
+
+async def get_all_books_async():
+    """get_all_books() on the async read path (see app.asgi)."""
+    return await run_read_async(_list_books(), "REPEATABLE READ")
+
+
+def render_book_list(page, fields, etag, updated_at):
+    # The rows hold just the selected columns, labelled with their fields
+    response = jsonify(BOOK_FIELDS.serializer(fields).many(page.items))
+    links = link_header(page)
+    if links:
+        response.headers["Link"] = links
+    return set_validators(response, etag, updated_at), 200
+
+
+@books_bp.route("/search", methods=["GET"])
+@replica_fallback
+def search_books():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Search query 'q' is required"}), 400
+
+    ts_query = func.websearch_to_tsquery("english", query)
+    # ts_rank() returns a float4; compare cursors in double precision so a
+    # rank read back from a cursor is exactly equal to the stored one. The
+    # query text is part of the sort name so a cursor cannot be replayed
+    # against a different search.
+    rank = cast(func.ts_rank(Book.search_vector, ts_query), Float)
+    sort_key = SortKey(f"rank:{query}", rank, descending=True)
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        fields = BOOK_FIELDS.parse(request.args.get("fields"))
+        with Session(read_engine(CATALOG)) as session:
+            page = paginate(
+                session,
+                select(*BOOK_FIELDS.columns(fields)).where(
+                    Book.search_vector.op("@@")(ts_query)
+                ),
+                sort_key,
+                Book.id,
+                cursor=request.args.get("cursor"),
+                limit=limit,
+            )
+    except (InvalidPageRequest, InvalidFieldset) as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(BOOK_FIELDS.serializer(fields).many(page.items))
+    links = link_header(page)
+    if links:
+        response.headers["Link"] = links
+    return response, 200
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "published_date",
+    "isbn",
+    "pages",
+    "cover",
+    "language",
+)
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_rows(export_format):
+    """Yield the catalog in chunks, reading it through a server-side cursor."""
+    columns = [getattr(Book, name) for name in EXPORT_COLUMNS]
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+
+    with Session(read_engine(CATALOG)) as session:
+        result = session.execute(
+            select(*columns)
+            .order_by(Book.id)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        for rows in result.partitions():
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    current_app.json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n"
+                    for row in rows
+                )
+
+
+@books_bp.route("/export", methods=["GET"])
+def export_books():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be one of: ndjson, csv"}), 400
+
+    response = Response(
+        stream_with_context(_export_rows(export_format)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=books.{export_format}"
+    )
+    return response
+
+
+def _validators_statement(book_id):
+    return select(Book.version, Book.updated_at).where(Book.id == book_id)
+
+
+def _get_book(book_id):
+    """GET /books/<id> as a read (see app.reads); cache hits run no query."""
+    cache = book_cache()
+    entry = cache.get(book_id)
+
+    if entry is None:
+        generation = cache.generation
+        # Revalidation only needs the validators, not the whole row
+        if request.if_none_match or request.if_modified_since:
+            validators = (yield _validators_statement(book_id)).first()
+            if validators is not None:
+                etag = _book_etag(book_id, validators.version, validators.updated_at)
+                if is_not_modified(etag, validators.updated_at):
+                    return not_modified(etag, validators.updated_at)
+
+        book = (yield select(Book).where(Book.id == book_id)).scalar_one_or_none()
         if book is None:
             return jsonify({"error": "Book not found"}), 404
 
-        return (
-            jsonify(
-                {
-                    "id": book.id,
-                    "title": book.title,
-                    "author": book.author,
-                    "published_date": book.published_date,
-                    "isbn": book.isbn,
-                    "pages": book.pages,
-                    "cover": book.cover,
-                    "language": book.language,
-                }
-            ),
-            200,
-        )
+        entry = CachedBook.from_book(book)
+        cache.set(book_id, entry, generation)
+
+    elif is_not_modified(entry.etag, entry.last_modified):
+        return not_modified(entry.etag, entry.last_modified)
+
+    return entry.response()
+
+
+@books_bp.route("/<int:book_id>", methods=["GET"])
+@replica_fallback
+def get_single_book(book_id):
+    return run_read(_get_book(book_id), read_engine(CATALOG))
+
+
+async def get_single_book_async(book_id):
+    """get_single_book() on the async read path (see app.asgi)."""
+    return await run_read_async(_get_book(book_id))
 
 
 @books_bp.route("/<int:book_id>", methods=["PUT"])
@@ -115,21 +549,17 @@ def update_book(book_id):
         book.cover = data.get("cover", book.cover)
         book.language = data.get("language", book.language)
 
-        session.commit()
+        if session.is_modified(book):
+            record_catalog_change(session, [book_id])
+        try:
+            session.commit()
+        except StaleDataError:
+            # The version check failed: someone else updated the book first
+            return jsonify({"error": "Book was modified concurrently"}), 409
+        book_cache().invalidate(book_id)
 
         return (
-            jsonify(
-                {
-                    "id": book.id,
-                    "title": book.title,
-                    "author": book.author,
-                    "published_date": book.published_date,
-                    "isbn": book.isbn,
-                    "pages": book.pages,
-                    "cover": book.cover,
-                    "language": book.language,
-                }
-            ),
+            jsonify(serialize_book(book)),
             200,
         )
 
@@ -142,7 +572,9 @@ def delete_book(book_id):
             return jsonify({"error": "Book not found"}), 404
 
         session.delete(book)
+        record_catalog_change(session, [book_id])
         session.commit()
+        book_cache().invalidate(book_id)
 
         return "", 204  # Return a 204 No Content response
 
@@ -153,21 +585,35 @@ def borrow_book(book_id):
     current_user_id = get_jwt_identity()
 
     with Session(db.engine) as session:
-
-        book = session.get(Book, book_id)
-        if book is None:
-            return jsonify({"error": "Book not found"}), 404
-
-        existing_borrow = (
-            session.query(Borrow).filter_by(book_id=book_id, return_date=None).first()
+        # Claim the book in one statement: the SELECT yields no row for an
+        # unknown book, and the partial unique index on open borrows turns a
+        # concurrent claim into a no-op instead of a second open borrow
+        claim = (
+            insert(Borrow)
+            .from_select(
+                ["user_id", "book_id", "borrow_date", "overdue_fine"],
+                select(
+                    literal(current_user_id),
+                    Book.id,
+                    literal(datetime.now(timezone.utc), DateTime),
+                    literal(0.0),
+                ).where(Book.id == book_id),
+            )
+            .on_conflict_do_nothing(
+                index_elements=[Borrow.book_id],
+                index_where=Borrow.return_date.is_(None),
+            )
+            .returning(Borrow.book_id, Borrow.user_id, Borrow.borrow_date)
         )
-        if existing_borrow:
-            return jsonify({"error": "Book is already borrowed"}), 400
-
-        new_borrow = Borrow(user_id=current_user_id, book_id=book_id)
-        session.add(new_borrow)
+        new_borrow = session.execute(claim).first()
+        pin_to_primary(session, current_user_id)
         session.commit()
 
+        if new_borrow is None:
+            if session.get(Book, book_id) is None:
+                return jsonify({"error": "Book not found"}), 404
+            return jsonify({"error": "Book is already borrowed"}), 400
+
         return (
             jsonify(
                 {
@@ -191,9 +637,11 @@ def return_book(book_id):
         if book is None:
             return jsonify({"error": "Book not found"}), 404
 
+        # Locked so a concurrent fine accrual cannot assess the same days
         borrow = (
             session.query(Borrow)
             .filter_by(book_id=book_id, user_id=current_user_id, return_date=None)
+            .with_for_update()
             .first()
         )
         if borrow is None:
@@ -211,10 +659,14 @@ def return_book(book_id):
         if borrow_duration > BORROWING_PERIOD_DAYS:
             overdue_days = borrow_duration - BORROWING_PERIOD_DAYS
             overdue_fine = overdue_days * FINE_RATE_PER_DAY
-            borrow.overdue_fine = overdue_fine
+            # Only the days not already accrued while the book was out
+            unassessed_cents = to_cents(overdue_fine) - borrow.assessed_fine_cents
+            if unassessed_cents > 0:
+                assess_fine(session, borrow, unassessed_cents)
 
         # Mark the book as returned
         borrow.return_date = datetime.now(timezone.utc)
+        pin_to_primary(session, current_user_id)
         session.commit()
 
         return (
@@ -1,75 +1,143 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
+from flask_jwt_extended import (
+    create_access_token,
+    get_jwt_identity,
+    jwt_required,
+    verify_jwt_in_request,
+)
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models import Book, Borrow, User, db
+from app.auth import invalidate_role, role_claims
+from app.fines import record_payment, to_cents
+from app.invalidation import notify_invalidation
+from app.models import Book, Borrow, FineBalance, FineLedgerEntry, User, db
+from app.pagination import (
+    InvalidPageRequest,
+    SortKey,
+    link_header,
+    paginate_read,
+    parse_limit,
+)
+from app.passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from app.reads import run_read, run_read_async
+from app.replicas import pin_to_primary, read_engine, replica_fallback
+from app.serializers import BORROWED_BOOK_FIELDS, InvalidFieldset, serialize_user
+from app.throttle import throttled
 
 users_bp = Blueprint("users", __name__, url_prefix="/users")
 
+# Ledger entries are listed in the order they were posted
+LEDGER_SORT_KEY = SortKey("id", FineLedgerEntry.id)
+
+
+def hashing_busy():
+    return (
+        jsonify({"error": "Too many sign-ins in progress, try again shortly"}),
+        503,
+        {"Retry-After": "1"},
+    )
+
 
 @users_bp.route("/register", methods=["POST"])
+@throttled
 def register_user():
     data = request.get_json()
 
-    # Check if the email or username already exists
+    # Check if the email or username already exists. No connection is held
+    # while the password is hashed below, which can take longer than any
+    # query and would otherwise tie up the pool during a burst.
     with Session(db.engine) as session:
-        existing_user = (
-            session.query(User)
-            .filter((User.email == data["email"]) | (User.username == data["username"]))
-            .first()
+        existing_user = session.scalar(
+            select(User.id)
+            .where((User.email == data["email"]) | (User.username == data["username"]))
+            .limit(1)
         )
-        if existing_user:
-            return jsonify({"error": "Email or Username already registered"}), 400
+    if existing_user is not None:
+        return jsonify({"error": "Email or Username already registered"}), 400
 
-        new_user = User(username=data["username"], email=data["email"])
-        new_user.set_password(data["password"])  # Hash the password
+    try:
+        password_hash = hash_password(data["password"])
+    except HashingBusy:
+        return hashing_busy()
 
+    with Session(db.engine) as session:
+        new_user = User(
+            username=data["username"],
+            email=data["email"],
+            password_hash=password_hash,
+        )
         session.add(new_user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            # Registered concurrently while the password was being hashed
+            return jsonify({"error": "Email or Username already registered"}), 400
 
-        return (
-            jsonify(
-                {
-                    "id": new_user.id,
-                    "username": new_user.username,
-                    "email": new_user.email,
-                }
-            ),
-            201,
-        )
+        return jsonify(serialize_user(new_user)), 201
 
 
 @users_bp.route("/login", methods=["POST"])
+@throttled
 def login_user():
     data = request.get_json()
     email = data.get("email")
     password = data.get("password")
 
+    # As in register_user(), the connection goes back to the pool before
+    # the password is checked
     with Session(db.engine) as session:
-        user = session.query(User).filter_by(email=email).first()
-        if user is None or not user.check_password(password):
-            return jsonify({"error": "Invalid credentials"}), 401
-
-        # Create an access token using Flask-JWT-Extended
-        access_token = create_access_token(identity=user.id)
-
-        return jsonify({"access_token": access_token}), 200
+        user = session.execute(
+            select(User.id, User.password_hash, User.is_admin, User.role_version).where(
+                User.email == email
+            )
+        ).first()
+
+    try:
+        valid = user is not None and verify_password(user.password_hash, password)
+    except HashingBusy:
+        return hashing_busy()
+    if not valid:
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    # Upgrade hashes made with an older method or cost while the password
+    # is at hand; a busy pool leaves it for a later login
+    if needs_rehash(user.password_hash):
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            password_hash = None
+        if password_hash is not None:
+            with Session(db.engine) as session:
+                # Unless the password was changed in the meantime
+                session.execute(
+                    update(User)
+                    .where(User.id == user.id, User.password_hash == user.password_hash)
+                    .values(password_hash=password_hash)
+                )
+                session.commit()
+
+    # Create an access token using Flask-JWT-Extended
+    access_token = create_access_token(
+        identity=user.id, additional_claims=role_claims(user)
+    )
+
+    return jsonify({"access_token": access_token}), 200
 
 
 @users_bp.route("/profile", methods=["GET"])
 @jwt_required()
+@replica_fallback
 def get_user_profile():
     current_user_id = get_jwt_identity()
 
-    with Session(db.engine) as session:
+    with Session(read_engine(current_user_id)) as session:
         user = session.get(User, current_user_id)
         if user is None:
             return jsonify({"error": "User not found"}), 404
 
-        return (
-            jsonify({"id": user.id, "username": user.username, "email": user.email}),
-            200,
-        )
+        return jsonify(serialize_user(user)), 200
 
 
 @users_bp.route("/profile", methods=["PUT"])
@@ -87,12 +155,10 @@ def update_user_profile():
         user.username = data.get("username", user.username)
         user.email = data.get("email", user.email)
 
+        pin_to_primary(session, current_user_id)
         session.commit()
 
-        return (
-            jsonify({"id": user.id, "username": user.username, "email": user.email}),
-            200,
-        )
+        return jsonify(serialize_user(user)), 200
 
 
 @users_bp.route("/profile", methods=["DELETE"])
@@ -106,73 +172,133 @@ def delete_user_profile():
             return jsonify({"error": "User not found"}), 404
 
         session.delete(user)
+        notify_invalidation(session, "role_versions", [current_user_id])
         session.commit()
+        invalidate_role(current_user_id)
 
         return "", 204  # Return a 204 No Content response
 
 
+def borrowed_books_statement(user_id, fields=BORROWED_BOOK_FIELDS.all):
+    stmt = (
+        select(*BORROWED_BOOK_FIELDS.columns(fields))
+        .select_from(Borrow)
+        .filter(Borrow.user_id == user_id, Borrow.return_date == None)
+        .order_by(Borrow.id)
+    )
+    if Book.__table__ in BORROWED_BOOK_FIELDS.tables(fields):
+        stmt = stmt.join(Book, Borrow.book_id == Book.id)
+    return stmt
+
+
+def render_borrowed_books(borrowed_books, fields):
+    serialize = BORROWED_BOOK_FIELDS.serializer(fields)
+    return jsonify({"borrowed_books": serialize.many(borrowed_books)}), 200
+
+
+def _borrowed_books(user_id):
+    """GET /users/borrowed-books as a read (see app.reads)."""
+    try:
+        fields = BORROWED_BOOK_FIELDS.parse(request.args.get("fields"))
+    except InvalidFieldset as e:
+        return jsonify({"error": str(e)}), 400
+
+    borrowed_books = (yield borrowed_books_statement(user_id, fields)).all()
+    return render_borrowed_books(borrowed_books, fields)
+
+
 @users_bp.route("/borrowed-books", methods=["GET"])
 @jwt_required()
+@replica_fallback
 def get_borrowed_books():
     current_user_id = get_jwt_identity()
+    return run_read(_borrowed_books(current_user_id), read_engine(current_user_id))
+
+
+async def get_borrowed_books_async():
+    """get_borrowed_books() on the async read path (see app.asgi)."""
+    verify_jwt_in_request()
+    return await run_read_async(_borrowed_books(get_jwt_identity()))
 
-    with Session(db.engine) as session:
-        borrowed_books = (
-            session.query(Borrow)
-            .join(Book, Borrow.book_id == Book.id)
-            .filter(Borrow.user_id == current_user_id, Borrow.return_date == None)
-            .all()
-        )
 
-        books_list = [
-            {
-                "book_id": borrow.book.id,
-                "title": borrow.book.title,
-                "author": borrow.book.author,
-                "borrow_date": borrow.borrow_date,
-            }
-            for borrow in borrowed_books
-        ]
+def fine_balance_statement(user_id):
+    # The running balance is maintained on every posting, so the total is a
+    # single-row read however long the history gets
+    return select(FineBalance.balance_cents).where(FineBalance.user_id == user_id)
+
+
+def fine_ledger_statement(user_id):
+    return (
+        select(
+            FineLedgerEntry.kind,
+            FineLedgerEntry.amount_cents,
+            FineLedgerEntry.created_at,
+            Book.title,
+            Borrow.borrow_date,
+            Borrow.return_date,
+        )
+        .select_from(FineLedgerEntry)
+        .outerjoin(Book, FineLedgerEntry.book_id == Book.id)
+        .outerjoin(Borrow, FineLedgerEntry.borrow_id == Borrow.id)
+        .where(FineLedgerEntry.user_id == user_id)
+    )
+
+
+def render_outstanding_fines(balance_cents, page):
+    fines_list = [
+        {
+            "entry_type": entry.kind,
+            "book_title": entry.title,
+            "fine_amount": entry.amount_cents / 100,
+            "posted_at": entry.created_at,
+            "borrow_date": entry.borrow_date,
+            "return_date": entry.return_date,
+        }
+        for entry in page.items
+    ]
+
+    response = jsonify(
+        {
+            "total_outstanding_fines": (balance_cents or 0) / 100,
+            "fines": fines_list,
+        }
+    )
+    links = link_header(page)
+    if links:
+        response.headers["Link"] = links
+    return response, 200
+
+
+def _outstanding_fines(user_id):
+    """GET /users/outstanding-fines as a read (see app.reads)."""
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        balance_cents = (yield fine_balance_statement(user_id)).scalar()
+        page = yield from paginate_read(
+            fine_ledger_statement(user_id),
+            LEDGER_SORT_KEY,
+            FineLedgerEntry.id,
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify({"borrowed_books": books_list}), 200
+    return render_outstanding_fines(balance_cents, page)
 
 
 @users_bp.route("/outstanding-fines", methods=["GET"])
 @jwt_required()
+@replica_fallback
 def view_outstanding_fines():
     current_user_id = get_jwt_identity()
+    return run_read(_outstanding_fines(current_user_id), read_engine(current_user_id))
 
-    with Session(db.engine) as session:
-        # Query all outstanding fines for the user
-        outstanding_fines = (
-            session.query(Borrow)
-            .join(Book, Borrow.book_id == Book.id)
-            .filter(Borrow.user_id == current_user_id, Borrow.overdue_fine > 0)
-            .all()
-        )
 
-        total_outstanding_fines = sum(
-            borrow.overdue_fine for borrow in outstanding_fines
-        )
-        fines_list = [
-            {
-                "book_title": borrow.book.title,
-                "fine_amount": borrow.overdue_fine,
-                "borrow_date": borrow.borrow_date,
-                "return_date": borrow.return_date,
-            }
-            for borrow in outstanding_fines
-        ]
-
-        return (
-            jsonify(
-                {
-                    "total_outstanding_fines": total_outstanding_fines,
-                    "fines": fines_list,
-                }
-            ),
-            200,
-        )
+async def view_outstanding_fines_async():
+    """view_outstanding_fines() on the async read path (see app.asgi)."""
+    verify_jwt_in_request()
+    return await run_read_async(_outstanding_fines(get_jwt_identity()))
 
 
 @users_bp.route("/pay-fine", methods=["POST"])
@@ -190,6 +316,8 @@ def pay_fine():
         borrow_record = (
             session.query(Borrow)
             .filter_by(user_id=current_user_id, book_id=book_id)
+            .order_by(Borrow.overdue_fine.desc(), Borrow.id)
+            .with_for_update()
             .first()
         )
 
@@ -201,7 +329,8 @@ def pay_fine():
 
         # Mark the fine as paid
         paid_amount = borrow_record.overdue_fine
-        borrow_record.overdue_fine = 0.0
+        record_payment(session, borrow_record, to_cents(paid_amount))
+        pin_to_primary(session, current_user_id)
         session.commit()
 
         return (
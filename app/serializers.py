@@ -0,0 +1,159 @@
+"""JSON encoding of responses, and the shape of each model in them.
+
+ORJSONProvider replaces Flask's JSON provider with orjson, which encodes
+dates and datetimes natively (ISO 8601; the naive UTC datetimes stored by
+the models get a "+00:00" offset) and is several times faster on large
+lists; `python -m benchmarks.serialization` measures it.
+
+The serializers below are the one definition of how a model is rendered,
+shared by every endpoint returning it. Each one fetches its fields with a
+single precompiled attrgetter, and works on ORM objects and result rows
+alike. A Fieldset also knows the column behind each field, so listings can
+take `?fields=` and select only the columns asked for.
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+
+import orjson
+from flask.json.provider import JSONProvider
+
+from app.models import Book, Borrow, User
+
+OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson; keys keep their insertion order."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return self.dumpb(obj, **kwargs).decode()
+
+    def dumpb(self, obj, indent=None, **kwargs):
+        option = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.dumpb(obj, indent=self._app.debug) + b"\n", mimetype=self.mimetype
+        )
+
+
+class Serializer:
+    """Renders an object as a dict of the given fields.
+
+    A field is an attribute name, or an `(output key, attribute)` pair when
+    the two differ.
+    """
+
+    def __init__(self, *fields):
+        fields = [(f, f) if isinstance(f, str) else f for f in fields]
+        self.keys = tuple(key for key, _ in fields)
+        values = attrgetter(*(attribute for _, attribute in fields))
+        # attrgetter of a single attribute returns the value, not a tuple
+        self._values = values if len(fields) > 1 else lambda obj: (values(obj),)
+
+    def __call__(self, obj):
+        return dict(zip(self.keys, self._values(obj)))
+
+    def many(self, objs):
+        keys, values = self.keys, self._values
+        return [dict(zip(keys, values(obj))) for obj in objs]
+
+
+class InvalidFieldset(ValueError):
+    """Raised when `?fields=` names a field the listing does not offer."""
+
+
+class Fieldset:
+    """The fields a listing can return, each with the column it reads.
+
+    Pass the fields as keyword arguments, in output order. Statements
+    select columns(fields), which labels each column with its field name,
+    and their rows are rendered by serializer(fields).
+    """
+
+    def __init__(self, **columns):
+        self._columns = columns
+        self.all = tuple(columns)
+        self.serializer = lru_cache(maxsize=None)(lambda fields: Serializer(*fields))
+
+    def parse(self, value):
+        """The fields picked by a `?fields=` value, or all of them if None."""
+        if value is None:
+            return self.all
+        requested = {name.strip() for name in value.split(",")} - {""}
+        if not requested:
+            raise InvalidFieldset("fields must name at least one field")
+        unknown = requested - set(self.all)
+        if unknown:
+            raise InvalidFieldset(
+                f"Unknown fields: {', '.join(sorted(unknown))}; "
+                f"available: {', '.join(self.all)}"
+            )
+        return tuple(name for name in self.all if name in requested)
+
+    def columns(self, fields):
+        return [self._columns[name].label(name) for name in fields]
+
+    def tables(self, fields):
+        """The tables the columns of `fields` come from."""
+        return {self._columns[name].property.columns[0].table for name in fields}
+
+
+BOOK_FIELDS = Fieldset(
+    id=Book.id,
+    title=Book.title,
+    author=Book.author,
+    published_date=Book.published_date,
+    isbn=Book.isbn,
+    pages=Book.pages,
+    cover=Book.cover,
+    language=Book.language,
+)
+serialize_book = BOOK_FIELDS.serializer(BOOK_FIELDS.all)
+
+# GET /admin/users also shows each user's role
+USER_FIELDS = Fieldset(
+    id=User.id, username=User.username, email=User.email, is_admin=User.is_admin
+)
+serialize_user = USER_FIELDS.serializer(("id", "username", "email"))
+
+# GET /admin/borrowed-books
+BORROW_FIELDS = Fieldset(
+    borrow_id=Borrow.id,
+    user_id=Borrow.user_id,
+    username=User.username,
+    book_id=Borrow.book_id,
+    book_title=Book.title,
+    borrow_date=Borrow.borrow_date,
+    return_date=Borrow.return_date,
+    overdue_fine=Borrow.overdue_fine,
+)
+
+# GET /users/borrowed-books: a user's open borrows
+BORROWED_BOOK_FIELDS = Fieldset(
+    book_id=Borrow.book_id,
+    title=Book.title,
+    author=Book.author,
+    borrow_date=Borrow.borrow_date,
+)
+
+
+def init_app(app):
+    app.json = ORJSONProvider(app)
@@ -0,0 +1,190 @@
+"""Token bucket throttling of the credential endpoints.
+
+Each attempt at /users/login and /users/register takes a token from the
+bucket of the client's IP address, then from the bucket of the account
+(email) it names, before any password is hashed or the database queried.
+A bucket holds up to `burst` tokens and refills at `per_minute` tokens a
+minute; an attempt finding one empty gets a 429 with Retry-After. Refused
+attempts still cost a token, down to a debt of one, so a client retrying
+in a loop stays locked out instead of winning each refilled token.
+
+Buckets live in a store, picked with THROTTLE_STORE: "memory" keeps them
+in the process, so each worker applies the limits on its own, and
+"postgres" shares them between all processes in the unlogged
+throttle_buckets table, at one upsert per bucket and attempt.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import NamedTuple
+
+from flask import current_app, jsonify, request
+from sqlalchemy import text
+
+from app.models import db
+
+
+class Limit(NamedTuple):
+    burst: int
+    per_minute: float
+
+    @property
+    def rate(self):
+        """Tokens refilled per second."""
+        return self.per_minute / 60
+
+    @property
+    def refill_seconds(self):
+        """Time for an indebted bucket to fill up again."""
+        return (self.burst + 1) / self.rate
+
+
+def _take(tokens, elapsed, limit):
+    tokens = min(limit.burst, tokens + elapsed * limit.rate)
+    return max(tokens - 1, -1.0)
+
+
+class MemoryStore:
+    """Buckets of this process, at most `max_keys` of them.
+
+    The least recently used buckets are dropped past that, which only lets
+    their clients start over with a full bucket.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        """Take a token; returns the tokens left, negative if there were none."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (limit.burst, now))
+            tokens = _take(tokens, now - updated_at, limit)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return tokens
+
+
+class PostgresStore:
+    """Buckets shared by every process, in the throttle_buckets table."""
+
+    # Same arithmetic as _take(), on the database clock
+    TAKE = text(
+        """
+        INSERT INTO throttle_buckets AS b (key, tokens, updated_at)
+        VALUES (:key, CAST(:burst AS float8) - 1, timezone('utc', clock_timestamp()))
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = GREATEST(
+                LEAST(
+                    CAST(:burst AS float8),
+                    b.tokens + CAST(:rate AS float8)
+                        * EXTRACT(EPOCH FROM excluded.updated_at - b.updated_at)::float8
+                ) - 1,
+                -1
+            ),
+            updated_at = excluded.updated_at
+        RETURNING tokens
+        """
+    )
+    PRUNE = text(
+        "DELETE FROM throttle_buckets "
+        "WHERE updated_at < timezone('utc', now()) - make_interval(secs => :idle)"
+    )
+
+    def __init__(self, idle_seconds, prune_interval=60):
+        # Buckets untouched for this long are full again, and can be deleted
+        self.idle_seconds = idle_seconds
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        """Take a token; returns the tokens left, negative if there were none."""
+        with db.engine.begin() as connection:
+            tokens = connection.scalar(
+                self.TAKE, {"key": key, "burst": limit.burst, "rate": limit.rate}
+            )
+            if self._prune_due():
+                connection.execute(self.PRUNE, {"idle": self.idle_seconds})
+        return tokens
+
+    def _prune_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_prune:
+                return False
+            self._next_prune = now + self.prune_interval
+            return True
+
+
+class Throttle:
+    def __init__(self, store, ip_limit, account_limit):
+        self.store = store
+        self.ip_limit = ip_limit
+        self.account_limit = account_limit
+
+    def check(self, ip, account):
+        """Seconds to wait before retrying, or None to let the attempt in.
+
+        The account's bucket is only drawn on once the IP's has let the
+        attempt through.
+        """
+        buckets = [(f"ip:{ip}", self.ip_limit)]
+        if account:
+            buckets.append((f"account:{account}", self.account_limit))
+        for key, limit in buckets:
+            tokens = self.store.take(key, limit)
+            if tokens < 0:
+                return (1 - tokens) / limit.rate
+        return None
+
+
+def throttled(view):
+    """Refuse the request with a 429 if its IP or account is out of tokens."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        throttle = current_app.extensions.get("throttle")
+        if throttle is not None:
+            data = request.get_json(silent=True)
+            email = data.get("email") if isinstance(data, dict) else None
+            account = email.strip().lower() if isinstance(email, str) else None
+            retry_after = throttle.check(request.remote_addr, account)
+            if retry_after is not None:
+                return (
+                    jsonify({"error": "Too many attempts, try again later"}),
+                    429,
+                    {"Retry-After": str(math.ceil(retry_after))},
+                )
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_app(app):
+    if not app.config["THROTTLE_ENABLED"]:
+        return
+
+    ip_limit = Limit(
+        app.config["THROTTLE_IP_BURST"], app.config["THROTTLE_IP_PER_MINUTE"]
+    )
+    account_limit = Limit(
+        app.config["THROTTLE_ACCOUNT_BURST"], app.config["THROTTLE_ACCOUNT_PER_MINUTE"]
+    )
+    store = app.config["THROTTLE_STORE"]
+    if store == "memory":
+        store = MemoryStore(app.config["THROTTLE_MEMORY_MAX_KEYS"])
+    elif store == "postgres":
+        store = PostgresStore(
+            max(ip_limit.refill_seconds, account_limit.refill_seconds)
+        )
+    else:
+        raise ValueError(f"Unknown THROTTLE_STORE {store!r}")
+
+    app.extensions["throttle"] = Throttle(store, ip_limit, account_limit)
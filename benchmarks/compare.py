@@ -0,0 +1,62 @@
+"""Compare two benchmark result files written by benchmarks.load.
+
+    poetry run python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before, after):
+    rows = []
+    for label in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        old = before["endpoints"].get(label)
+        new = after["endpoints"].get(label)
+        if old is None or new is None:
+            rows.append((label, "only in " + ("after" if old is None else "before")))
+            continue
+        rows.append(
+            (
+                label,
+                "  ".join(
+                    f"{metric} {old[metric]} -> {new[metric]} ({_change(old[metric], new[metric])})"
+                    for metric in METRICS
+                ),
+            )
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(
+        f"{before.get('git_revision')} ({before['scenario']}) -> "
+        f"{after.get('git_revision')} ({after['scenario']})"
+    )
+    print(
+        f"total req/s {before['total_rps']} -> {after['total_rps']} "
+        f"({_change(before['total_rps'], after['total_rps'])})\n"
+    )
+    for label, summary in compare(before, after):
+        print(f"{label:32} {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""Load benchmark for the REST API.
+
+Starts the app on a local port (or targets an already running server with
+--url), drives a weighted mix of scripted user journeys from a pool of
+worker threads and reports throughput and latency percentiles per endpoint.
+
+    poetry run python -m benchmarks.load --scenario mixed --duration 30
+
+Results are written as JSON to benchmarks/results/ so two runs can be
+compared with `python -m benchmarks.compare before.json after.json`.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app, db
+from app.models import Book, User
+
+BENCH_PASSWORD = "benchpassword"
+ADMIN_EMAIL = "bench_admin@example.com"
+
+# Relative weights of each journey in a scenario
+SCENARIOS = {
+    "browse": {"browse": 1},
+    "login": {"login": 1},
+    "borrow": {"borrow_return": 1},
+    "admin": {"admin": 1},
+    "mixed": {"browse": 70, "login": 10, "borrow_return": 15, "admin": 5},
+}
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label, latency, status):
+        with self._lock:
+            self.samples[label].append(latency)
+            self.statuses[label][status] += 1
+
+
+class Client:
+    """A keep-alive HTTP client for one worker thread."""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, method, path, label, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+            link = response.getheader("Link")
+        except (OSError, http.client.HTTPException):
+            # Reconnect and count the failure as a 599 "network error"
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            data, status, link = b"", 599, None
+        self.recorder.record(label, time.perf_counter() - start, status)
+        return status, data, link
+
+
+def _next_path(link):
+    match = re.search(r'<([^>]+)>; rel="next"', link or "")
+    if not match:
+        return None
+    parts = urlsplit(match.group(1))
+    return f"{parts.path}?{parts.query}"
+
+
+def browse(client, state):
+    path = "/books/?limit=50"
+    for _ in range(random.randint(1, 3)):
+        status, data, link = client.request("GET", path, "GET /books/")
+        path = _next_path(link)
+        if status != 200 or not path:
+            break
+    book_id = random.randint(1, state["book_count"])
+    client.request("GET", f"/books/{book_id}", "GET /books/<id>")
+
+
+def login(client, state):
+    user = random.choice(state["users"])
+    client.request(
+        "POST",
+        "/users/login",
+        "POST /users/login",
+        body={"email": user, "password": BENCH_PASSWORD},
+    )
+
+
+def borrow_return(client, state):
+    # Each worker owns a disjoint slice of the catalog so journeys do not
+    # collide on the same book
+    book_id = random.randrange(
+        state["worker"] + 1, state["book_count"] + 1, state["workers"]
+    )
+    token = state["token"]
+    status, _, _ = client.request(
+        "POST", f"/books/{book_id}/borrow", "POST /books/<id>/borrow", token=token
+    )
+    if status == 200:
+        client.request(
+            "POST", f"/books/{book_id}/return", "POST /books/<id>/return", token=token
+        )
+
+
+def admin(client, state):
+    token = state["admin_token"]
+    client.request("GET", "/admin/users", "GET /admin/users", token=token)
+    client.request(
+        "GET", "/admin/borrowed-books", "GET /admin/borrowed-books", token=token
+    )
+
+
+JOURNEYS = {
+    "browse": browse,
+    "login": login,
+    "borrow_return": borrow_return,
+    "admin": admin,
+}
+
+
+def seed(app, books, users):
+    """Top up the database with benchmark books, users and an admin account."""
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    with app.app_context():
+        db.create_all()
+        missing = books - db.session.scalar(select(func.count(Book.id)))
+        if missing > 0:
+            db.session.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Benchmark Book {i}",
+                        "author": f"Author {i % 997}",
+                        "language": "English",
+                    }
+                    for i in range(missing)
+                ],
+            )
+
+        existing = set(
+            db.session.scalars(
+                select(User.email).where(User.email.like("bench_%@example.com"))
+            )
+        )
+        wanted = [f"bench_user_{i}@example.com" for i in range(users)] + [ADMIN_EMAIL]
+        new_users = [
+            {
+                "username": email.split("@")[0],
+                "email": email,
+                "password_hash": password_hash,
+                "is_admin": email == ADMIN_EMAIL,
+            }
+            for email in wanted
+            if email not in existing
+        ]
+        if new_users:
+            db.session.execute(insert(User), new_users)
+        db.session.commit()
+
+
+def _login_token(base_url, email):
+    client = Client(base_url, Recorder())
+    status, data, _ = client.request(
+        "POST",
+        "/users/login",
+        "setup",
+        body={"email": email, "password": BENCH_PASSWORD},
+    )
+    if status != 200:
+        raise SystemExit(f"Could not log in as {email}: HTTP {status}")
+    return json.loads(data)["access_token"]
+
+
+def _worker(base_url, recorder, weights, deadline, state):
+    client = Client(base_url, recorder)
+    names, counts = zip(*weights.items())
+    while time.monotonic() < deadline:
+        JOURNEYS[random.choices(names, counts)[0]](client, state)
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(
+        0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1)
+    )
+    return sorted_samples[rank]
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for label, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        statuses = recorder.statuses[label]
+        results[label] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+            "errors": sum(n for status, n in statuses.items() if status >= 500),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        }
+    return results
+
+
+def print_report(results):
+    header = f"{'endpoint':32} {'reqs':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for label, row in results.items():
+        print(
+            f"{label:32} {row['requests']:>8} {row['rps']:>9} {row['p50_ms']:>9} "
+            f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['errors']:>7}"
+        )
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--warmup", type=float, default=3, help="unrecorded seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--books", type=int, default=10_000, help="minimum books")
+    parser.add_argument("--users", type=int, default=100, help="benchmark users")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results"))
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    app = create_app()
+    seed(app, args.books, args.users)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = make_server(
+            "127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    with app.app_context():
+        book_count = db.session.scalar(select(func.max(Book.id)))
+    shared = {
+        "book_count": book_count,
+        "users": [f"bench_user_{i}@example.com" for i in range(args.users)],
+        "token": _login_token(base_url, "bench_user_0@example.com"),
+        "admin_token": _login_token(base_url, ADMIN_EMAIL),
+        "workers": args.concurrency,
+    }
+    weights = SCENARIOS[args.scenario]
+
+    def run(seconds, recorder):
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(base_url, recorder, weights, deadline, {**shared, "worker": i}),
+            )
+            for i in range(args.concurrency)
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - start
+
+    if args.warmup:
+        run(args.warmup, Recorder())
+    recorder = Recorder()
+    elapsed = run(args.duration, recorder)
+    if server is not None:
+        server.shutdown()
+
+    results = summarize(recorder, elapsed)
+    print_report(results)
+
+    os.makedirs(args.output, exist_ok=True)
+    started = datetime.now(timezone.utc)
+    path = os.path.join(args.output, f"{started:%Y%m%dT%H%M%S}-{args.scenario}.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "scenario": args.scenario,
+                "git_revision": _git_revision(),
+                "timestamp": started.isoformat(),
+                "duration_s": round(elapsed, 2),
+                "concurrency": args.concurrency,
+                "target": args.url or "in-process werkzeug server",
+                "total_rps": round(
+                    sum(len(s) for s in recorder.samples.values()) / elapsed, 2
+                ),
+                "endpoints": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Micro-benchmark of JSON response serialization.
+
+Renders a list of books the way the endpoints used to (a dict built by
+hand per row, encoded by Flask's default JSON provider) and the way they do
+now (the shared serializer, encoded by orjson), and reports the best time
+of each over a few repetitions. No database is needed.
+
+    poetry run python -m benchmarks.serialization --rows 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models import Book
+from app.serializers import ORJSONProvider, serialize_book
+
+
+def _books(rows, seed):
+    rng = random.Random(seed)
+    start = date(1950, 1, 1)
+    return [
+        Book(
+            id=n,
+            title=f"Book title {rng.randrange(10**9)}",
+            author=f"Author {rng.randrange(10**5)}",
+            published_date=start + timedelta(days=rng.randrange(27_000)),
+            isbn=f"{rng.randrange(10**13):013d}",
+            pages=rng.randrange(50, 1200),
+            cover=None,
+            language="English",
+        )
+        for n in range(1, rows + 1)
+    ]
+
+
+def render_by_hand(app, books):
+    return app.json.response(
+        [
+            {
+                "id": book.id,
+                "title": book.title,
+                "author": book.author,
+                "published_date": book.published_date,
+                "isbn": book.isbn,
+                "pages": book.pages,
+                "cover": book.cover,
+                "language": book.language,
+            }
+            for book in books
+        ]
+    ).get_data()
+
+
+def render_with_serializer(app, books):
+    return app.json.response(serialize_book.many(books)).get_data()
+
+
+def _best(fn, app, books, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(app, books)
+        times.append(time.perf_counter() - start)
+    return min(times), len(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args(argv)
+
+    books = _books(args.rows, args.seed)
+    app = Flask(__name__)
+    cases = [
+        ("hand-built dicts + json", DefaultJSONProvider(app), render_by_hand),
+        ("serializer + orjson", ORJSONProvider(app), render_with_serializer),
+    ]
+
+    print(f"{args.rows} books, best of {args.repeat}")
+    baseline = None
+    for label, provider, fn in cases:
+        app.json = provider
+        with app.app_context():
+            seconds, size = _best(fn, app, books, args.repeat)
+        baseline = baseline or seconds
+        print(
+            f"  {label:<26} {seconds * 1000:8.1f} ms  {size / 2**20:6.1f} MiB"
+            f"  {baseline / seconds:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,35 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _parse_query_budgets(value):
+    """Parse `"books.get_all_books=2,admin.view_all_users=3"` into a dict."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        endpoint, _, budget = item.partition("=")
+        budgets[endpoint.strip()] = int(budget)
+    return budgets
+
+
+def _split_list(value):
+    """Parse `"a, b,c"` into `["a", "b", "c"]`."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _replica_binds(url_template, hosts, engine_options, connect_timeout):
+    """Build a `replica_<n>` bind for each host, with the primary's options."""
+    return {
+        f"replica_{index}": {
+            **engine_options,
+            "url": url_template.format(host=host),
+            "connect_args": {
+                **engine_options["connect_args"],
+                "connect_timeout": connect_timeout,
+            },
+        }
+        for index, host in enumerate(hosts)
+    }
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
     POSTGRES_USER = os.getenv("POSTGRES_USER")
@@ -18,6 +47,59 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool of each worker process. Size it to the worker's
+    # threads; /admin/pool-stats shows how long checkouts wait. Connections
+    # older than DB_POOL_RECYCLE seconds are replaced. DB_POOL_PRE_PING
+    # tests each connection with a round trip on checkout; turn it on only
+    # where something drops idle connections sooner than the recycle time.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    # Whole seconds: Flask-SQLAlchemy coerces pool_timeout to an int
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+    # Server-side limit on every statement in milliseconds (0 = none), and
+    # the name the connections report in pg_stat_activity
+    DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 0))
+    DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "library-api")
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {
+            "application_name": DB_APPLICATION_NAME,
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}",
+        },
+    }
+
+    # Read replicas (optional): "host[:port]" entries sharing the primary's
+    # credentials and database. GET endpoints read from a replica that the
+    # health check (every REPLICA_CHECK_INTERVAL seconds) found reachable
+    # and at most REPLICA_MAX_LAG seconds behind, except for data written
+    # through the API in the last REPLICA_PIN_SECONDS.
+    POSTGRES_REPLICA_HOSTS = _split_list(os.getenv("POSTGRES_REPLICA_HOSTS", ""))
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 1))
+    REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 2))
+    REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", 5))
+    # Seconds to wait for a replica connection before giving up on it
+    REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", 2))
+
+    SQLALCHEMY_BINDS = _replica_binds(
+        f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{{host}}/{POSTGRES_DB}",
+        POSTGRES_REPLICA_HOSTS,
+        SQLALCHEMY_ENGINE_OPTIONS,
+        REPLICA_CONNECT_TIMEOUT,
+    )
+
+    # Connection pool of the asyncpg engine behind the ASGI read path
+    # (app.asgi); one connection serves one in-flight query, not one thread.
+    # Timeout, recycling, pre-ping and the settings above are shared.
+    ASYNC_POOL_SIZE = int(os.getenv("ASYNC_POOL_SIZE", 20))
+    ASYNC_MAX_OVERFLOW = int(os.getenv("ASYNC_MAX_OVERFLOW", 10))
+
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv(
         "JWT_SECRET_KEY", "your_default_jwt_secret_key"
@@ -30,3 +112,81 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = int(
         os.getenv("JWT_REFRESH_TOKEN_EXPIRES", 86400)
     )  # Default to 1 day (in seconds)
+
+    # Password hashes: werkzeug method and cost ("scrypt:<n>:<r>:<p>" or
+    # "pbkdf2:<hash>:<iterations>"); stored hashes made with other
+    # parameters are replaced on the user's next login. Hashing runs in
+    # PASSWORD_HASH_WORKERS processes (0 = on the request thread), and
+    # registrations and logins get a 503 while PASSWORD_HASH_MAX_PENDING
+    # hashes are already queued or running in the app process.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 16))
+
+    # Token buckets in front of login and registration, per client IP and
+    # per account: up to BURST attempts at once, refilled at PER_MINUTE.
+    # THROTTLE_STORE is "memory" (limits per process, at most
+    # THROTTLE_MEMORY_MAX_KEYS buckets) or "postgres" (shared by all
+    # processes, one write per attempt).
+    THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "true").lower() == "true"
+    THROTTLE_STORE = os.getenv("THROTTLE_STORE", "memory")
+    THROTTLE_IP_BURST = int(os.getenv("THROTTLE_IP_BURST", 30))
+    THROTTLE_IP_PER_MINUTE = float(os.getenv("THROTTLE_IP_PER_MINUTE", 30))
+    THROTTLE_ACCOUNT_BURST = int(os.getenv("THROTTLE_ACCOUNT_BURST", 10))
+    THROTTLE_ACCOUNT_PER_MINUTE = float(os.getenv("THROTTLE_ACCOUNT_PER_MINUTE", 5))
+    THROTTLE_MEMORY_MAX_KEYS = int(os.getenv("THROTTLE_MEMORY_MAX_KEYS", 100000))
+
+    # How long (in seconds) a process trusts its cached copy of a user's
+    # role version before re-reading it; bounds how fast role changes apply
+    # in processes that miss the invalidation (no listener running)
+    ROLE_VERSION_CACHE_TTL = float(os.getenv("ROLE_VERSION_CACHE_TTL", 30))
+
+    # Serialized single-book responses kept per process; 0 disables the
+    # cache. The TTL (seconds) bounds staleness after writes made elsewhere.
+    BOOK_CACHE_MAX_ENTRIES = int(os.getenv("BOOK_CACHE_MAX_ENTRIES", 10000))
+    BOOK_CACHE_TTL = float(os.getenv("BOOK_CACHE_TTL", 60))
+
+    # Evict cache entries written by other processes as soon as they commit,
+    # via Postgres LISTEN/NOTIFY; needs one extra connection per process
+    CACHE_INVALIDATION_LISTENER = (
+        os.getenv("CACHE_INVALIDATION_LISTENER", "false").lower() == "true"
+    )
+
+    # Keyset pagination for list endpoints
+    PAGINATION_DEFAULT_LIMIT = int(os.getenv("PAGINATION_DEFAULT_LIMIT", 50))
+    PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", 500))
+
+    # Accept-Encoding negotiated compression of text responses of at least
+    # COMPRESSION_MIN_SIZE bytes (streams are always compressed); zstd and
+    # brotli need the `compression` extra, gzip is built in
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+    # Rows fetched per round trip by the streaming catalog export
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Rows written per INSERT statement by the bulk book import
+    BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 1000))
+
+    # Per-request query counting, Server-Timing headers and request logs.
+    # Budgets are "endpoint=max_queries" pairs, e.g. "books.get_all_books=2".
+    INSTRUMENTATION_ENABLED = (
+        os.getenv("INSTRUMENTATION_ENABLED", "false").lower() == "true"
+    )
+    INSTRUMENTATION_QUERY_BUDGETS = _parse_query_budgets(
+        os.getenv("INSTRUMENTATION_QUERY_BUDGETS", "")
+    )
+    INSTRUMENTATION_DEFAULT_QUERY_BUDGET = (
+        int(os.environ["INSTRUMENTATION_DEFAULT_QUERY_BUDGET"])
+        if os.getenv("INSTRUMENTATION_DEFAULT_QUERY_BUDGET")
+        else None
+    )
+
+    # Seconds between in-process fine accrual runs; 0 leaves accrual to
+    # `flask fines accrue` (e.g. from cron)
+    FINE_ACCRUAL_INTERVAL = float(os.getenv("FINE_ACCRUAL_INTERVAL", 0))
+    # Open borrows updated per transaction by fine accrual
+    FINE_ACCRUAL_BATCH_SIZE = int(os.getenv("FINE_ACCRUAL_BATCH_SIZE", 10000))
@@ -0,0 +1,55 @@
+"""add book full-text search
+
+Revision ID: 3f1c9a2d7b54
+Revises: 8b53d2af7110
+Create Date: 2026-10-18 11:20:04.511872
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a2d7b54"
+down_revision = "8b53d2af7110"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B')"
+)
+
+
+def upgrade():
+    # Adding a stored generated column rewrites the table once; the index is
+    # then built without blocking writes.
+    op.add_column(
+        "books",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_search_vector",
+            "books",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_books_search_vector",
+            table_name="books",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("books", "search_vector")
@@ -0,0 +1,41 @@
+"""enforce one open borrow per book
+
+Revision ID: 400ec6612422
+Revises: 7b38716c3c80
+Create Date: 2026-10-18 12:05:20.439770
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "400ec6612422"
+down_revision = "7b38716c3c80"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if a book already has more than one open borrow; close the
+    # duplicates before upgrading. If a concurrent build is interrupted it
+    # leaves an INVALID index behind that must be dropped before retrying.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_borrows_open_book_id",
+            "borrows",
+            ["book_id"],
+            unique=True,
+            postgresql_where=sa.text("return_date IS NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_borrows_open_book_id",
+            table_name="borrows",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,46 @@
+"""add borrow access path indexes
+
+Revision ID: c52e8f1a9d03
+Revises: 400ec6612422
+Create Date: 2026-10-18 12:31:47.102385
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c52e8f1a9d03"
+down_revision = "400ec6612422"
+branch_labels = None
+depends_on = None
+
+# name -> (columns, partial index predicate)
+INDEXES = {
+    "ix_borrows_open_user_id": (["user_id", "id"], "return_date IS NULL"),
+    "ix_borrows_fined_user_id": (["user_id", "id"], "overdue_fine > 0"),
+    "ix_borrows_user_id_book_id": (["user_id", "book_id"], None),
+    "ix_borrows_book_id": (["book_id"], None),
+}
+
+
+def upgrade():
+    # Built one at a time without blocking writes. An interrupted build
+    # leaves an INVALID index behind that must be dropped before retrying.
+    with op.get_context().autocommit_block():
+        for name, (columns, where) in INDEXES.items():
+            op.create_index(
+                name,
+                "borrows",
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in reversed(list(INDEXES)):
+            op.drop_index(name, table_name="borrows", postgresql_concurrently=True)
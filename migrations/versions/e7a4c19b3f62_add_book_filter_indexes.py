@@ -0,0 +1,44 @@
+"""add book filter indexes
+
+Revision ID: e7a4c19b3f62
+Revises: d3e8b1f04a27
+Create Date: 2026-10-18 17:24:09.318560
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e7a4c19b3f62"
+down_revision = "d3e8b1f04a27"
+branch_labels = None
+depends_on = None
+
+# name -> columns; must match BOOK_PUBLISHED_ORDER in app.models for the
+# planner to use the expression index
+INDEXES = {
+    "ix_books_language_id": ["language", "id"],
+    "ix_books_author_id": ["author", "id"],
+    "ix_books_published_order_id": [
+        sa.text("coalesce(published_date, CAST('0001-01-01' AS DATE))"),
+        "id",
+    ],
+}
+
+
+def upgrade():
+    # Built one at a time without blocking writes. An interrupted build
+    # leaves an INVALID index behind that must be dropped before retrying.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, "books", columns, unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in reversed(list(INDEXES)):
+            op.drop_index(name, table_name="books", postgresql_concurrently=True)
@@ -1,79 +1,379 @@
 # seed_data.py
+"""Generate a synthetic library and load it with COPY in parallel chunks.
 
-from datetime import datetime, timedelta, timezone
+    python seed_data.py                                   # small demo dataset
+    python seed_data.py --books 5_000_000 --users 500_000 --borrows 50_000_000
+
+The tables are dropped and recreated. Secondary indexes are dropped while
+loading and rebuilt once at the end. The three demo accounts below always
+exist; every synthetic user shares the password `password123`.
+
+Distributions:
+- book popularity and user activity are power-law skewed (`--skew`), so a
+  small share of titles and readers account for most borrows;
+- a share of borrows (`--open-ratio`) is still open, at most one per book,
+  with an overdue tail past the borrowing period;
+- returned borrows form a multi-year history, mostly returned on time, with
+  an exponential tail of late returns carrying fines.
+"""
+
+import argparse
+import csv
+import functools
+import io
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
 
 from app import create_app, db
-from app.models import Book, Borrow, User
-
-app = create_app()
-
-# Use app context
-with app.app_context():
-    # Drop all existing tables and recreate them
-    db.session.remove()
-    db.drop_all()
-    db.create_all()
-
-    # Create admin user
-    admin_user = User(username="admin_user", email="admin@example.com", is_admin=True)
-    admin_user.set_password("adminpassword123")
-    db.session.add(admin_user)
-
-    # Create regular users
-    user1 = User(username="john_doe", email="john.doe@example.com")
-    user1.set_password("password123")
-    user2 = User(username="jane_doe", email="jane.doe@example.com")
-    user2.set_password("password456")
-    db.session.add(user1)
-    db.session.add(user2)
-
-    # Commit the users to get their IDs
-    db.session.commit()
-
-    # Create books
-    book1 = Book(
-        title="The Pragmatic Programmer",
-        author="Andy Hunt",
-        published_date="1999-10-20",
-        isbn="9780201616224",
-        pages=352,
-        cover="https://example.com/pragmatic.jpg",
-        language="English",
+from app.catalog import bump_catalog_version
+from app.fines import BORROWING_PERIOD_DAYS, FINE_RATE_PER_DAY, run_accrual, to_cents
+
+DEMO_USERS = [
+    ("admin_user", "admin@example.com", "adminpassword123", True),
+    ("john_doe", "john.doe@example.com", "password123", False),
+    ("jane_doe", "jane.doe@example.com", "password456", False),
+]
+SYNTHETIC_PASSWORD = "password123"
+
+LANGUAGES = [
+    "English",
+    "Spanish",
+    "French",
+    "German",
+    "Portuguese",
+    "Italian",
+    "Japanese",
+]
+LANGUAGE_WEIGHTS = [60, 12, 8, 7, 6, 4, 3]
+TITLE_WORDS = (
+    "Code Clean Pragmatic Patterns Design Refactoring Algorithms Data Systems "
+    "Distributed Secret History Garden Night River Empire Shadow Winter Light "
+    "Silent Lost City Storm Journey Quiet Stone Glass Memory Ocean Fire Iron"
+).split()
+FIRST_NAMES = (
+    "Ada Alan Grace Linus Barbara Donald Edsger Frances Ken Margaret Robert "
+    "Andy Martin Kent Ward Jane Mary Leo Clarice Gabriel Toni Haruki Chinua"
+).split()
+LAST_NAMES = (
+    "Lovelace Turing Hopper Torvalds Liskov Knuth Dijkstra Allen Thompson "
+    "Hamilton Martin Hunt Fowler Beck Cunningham Austen Shelley Tolstoy "
+    "Lispector Marquez Morrison Murakami Achebe"
+).split()
+
+HISTORY_DAYS = 3 * 365
+CHUNK_SIZE = 200_000
+
+
+@functools.cache
+def _multiplier(count):
+    # A multiplier coprime with `count` makes _scatter a permutation of 1..count
+    multiplier = 2_654_435_761
+    while math.gcd(multiplier, count) != 1:
+        multiplier += 2
+    return multiplier
+
+
+def _scatter(rank, count):
+    """Map a popularity rank to an id so popular rows are spread over the table."""
+    return (rank * _multiplier(count)) % count + 1
+
+
+def _skewed_rank(rng, count, skew):
+    """Draw a 0-based rank where low ranks are much more likely."""
+    return min(count - 1, int(count * rng.random() ** skew))
+
+
+def _user_rows(rng, lo, hi, password_hash):
+    for user_id in range(lo, hi):
+        yield (
+            user_id,
+            f"user{user_id}",
+            f"user{user_id}@example.com",
+            password_hash,
+            False,
+        )
+
+
+def _book_rows(rng, lo, hi):
+    first_year = date(1900, 1, 1).toordinal()
+    last_year = date(2024, 12, 31).toordinal()
+    for book_id in range(lo, hi):
+        published = (
+            date.fromordinal(rng.randint(first_year, last_year))
+            if rng.random() > 0.05
+            else None
+        )
+        yield (
+            book_id,
+            " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 4))),
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            published,
+            f"978{book_id:010d}",
+            rng.randint(50, 1200),
+            f"https://covers.example.com/{book_id}.jpg",
+            rng.choices(LANGUAGES, LANGUAGE_WEIGHTS)[0],
+        )
+
+
+def _borrow_rows(rng, lo, hi, options, now):
+    books, users, skew = options["books"], options["users"], options["skew"]
+    open_count = options["open_borrows"]
+    overdue_ratio = options["overdue_ratio"]
+    late_return_ratio = options["late_return_ratio"]
+    # Plain random() arithmetic is several times cheaper than randint()
+    random, expovariate = rng.random, rng.expovariate
+    day = 86_400
+
+    for borrow_id in range(lo, hi):
+        user_id = _scatter(_skewed_rank(rng, users, skew), users)
+
+        if borrow_id <= open_count:
+            # Open borrows take the most popular books, one borrow each
+            book_id = _scatter(borrow_id - 1, books)
+            if random() < overdue_ratio:
+                days_out = BORROWING_PERIOD_DAYS + 1 + int(expovariate(1 / 20))
+            else:
+                days_out = int(random() * (BORROWING_PERIOD_DAYS + 1))
+            borrow_date = now - timedelta(seconds=days_out * day + int(random() * day))
+            yield (borrow_id, user_id, book_id, borrow_date, None, 0.0, 0)
+            continue
+
+        book_id = _scatter(_skewed_rank(rng, books, skew), books)
+        days_ago = BORROWING_PERIOD_DAYS + int(
+            random() * (HISTORY_DAYS - BORROWING_PERIOD_DAYS)
+        )
+        borrow_date = now - timedelta(seconds=days_ago * day + int(random() * day))
+        if random() < late_return_ratio:
+            days_kept = BORROWING_PERIOD_DAYS + 1 + int(expovariate(1 / 10))
+        else:
+            days_kept = 1 + int(random() * BORROWING_PERIOD_DAYS)
+        days_kept = min(days_kept, days_ago)
+        overdue_days = max(0, days_kept - BORROWING_PERIOD_DAYS)
+        yield (
+            borrow_id,
+            user_id,
+            book_id,
+            borrow_date,
+            borrow_date + timedelta(days=days_kept),
+            overdue_days * FINE_RATE_PER_DAY,
+            overdue_days * to_cents(FINE_RATE_PER_DAY),
+        )
+
+
+TABLES = {
+    "users": ("id", "username", "email", "password_hash", "is_admin"),
+    "books": (
+        "id",
+        "title",
+        "author",
+        "published_date",
+        "isbn",
+        "pages",
+        "cover",
+        "language",
+    ),
+    "borrows": (
+        "id",
+        "user_id",
+        "book_id",
+        "borrow_date",
+        "return_date",
+        "overdue_fine",
+        "assessed_fine_cents",
+    ),
+}
+
+# Late returns were fined when the borrow was generated; post those fines as
+# ledger assessments and derive each reader's balance from them
+LEDGER_BACKFILL = [
+    "INSERT INTO fine_ledger "
+    "(user_id, borrow_id, book_id, kind, amount_cents, created_at) "
+    "SELECT user_id, id, book_id, 'assessment', round(overdue_fine * 100), "
+    "coalesce(return_date, borrow_date) FROM borrows "
+    "WHERE overdue_fine > 0 ORDER BY id",
+    "INSERT INTO fine_balances (user_id, balance_cents, updated_at) "
+    "SELECT user_id, sum(amount_cents), max(created_at) FROM fine_ledger "
+    "GROUP BY user_id",
+]
+
+
+def _copy_chunk(task):
+    """Generate rows `[lo, hi)` of one table and COPY them in (runs in a worker)."""
+    dsn, table, lo, hi, options = task
+    rng = random.Random(f"{options['seed']}:{table}:{lo}")
+    now = options["now"]
+
+    if table == "users":
+        rows = _user_rows(rng, lo, hi, options["password_hash"])
+    elif table == "books":
+        rows = _book_rows(rng, lo, hi)
+    else:
+        rows = _borrow_rows(rng, lo, hi, options, now)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(TABLES[table])}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    conn.close()
+    return hi - lo
+
+
+def _load(pool, dsn, table, first_id, last_id, options):
+    start = time.monotonic()
+    tasks = [
+        (dsn, table, lo, min(lo + options["chunk_size"], last_id + 1), options)
+        for lo in range(first_id, last_id + 1, options["chunk_size"])
+    ]
+    loaded = sum(pool.map(_copy_chunk, tasks))
+    elapsed = time.monotonic() - start
+    print(
+        f"  {table}: {loaded:,} rows in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic library dataset."
+    )
+    parser.add_argument("--books", type=int, default=1_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--borrows", type=int, default=5_000)
+    parser.add_argument(
+        "--open-ratio", type=float, default=0.02, help="share of borrows still open"
     )
-    book2 = Book(
-        title="Clean Code",
-        author="Robert C. Martin",
-        published_date="2008-08-01",
-        isbn="9780132350884",
-        pages=464,
-        cover="https://example.com/clean_code.jpg",
-        language="English",
+    parser.add_argument(
+        "--overdue-ratio",
+        type=float,
+        default=0.15,
+        help="share of open borrows past due",
     )
-    db.session.add(book1)
-    db.session.add(book2)
-
-    # Commit the books to get their IDs
-    db.session.commit()
-
-    # Create borrow records now that user and book IDs are available
-    borrow1 = Borrow(
-        user_id=user1.id,
-        book_id=book1.id,
-        borrow_date=datetime.now(timezone.utc) - timedelta(days=10),
-        return_date=None,
-        overdue_fine=6.0,
+    parser.add_argument(
+        "--late-return-ratio",
+        type=float,
+        default=0.1,
+        help="share of returns that were late",
     )
-    borrow2 = Borrow(
-        user_id=user2.id,
-        book_id=book2.id,
-        borrow_date=datetime.now(timezone.utc) - timedelta(days=5),
-        return_date=None,
-        overdue_fine=0.0,
+    parser.add_argument(
+        "--skew", type=float, default=3.0, help="popularity skew (1 = uniform)"
     )
-    db.session.add(borrow1)
-    db.session.add(borrow2)
+    parser.add_argument("--workers", type=int, default=4, help="parallel COPY workers")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
 
-    # Commit all changes
-    db.session.commit()
+    users = max(args.users, len(DEMO_USERS))
+    books = max(args.books, 1)
+    options = {
+        "seed": args.seed,
+        "now": datetime.now(timezone.utc),
+        "books": books,
+        "users": users,
+        "skew": args.skew,
+        "open_borrows": min(int(args.borrows * args.open_ratio), books),
+        "overdue_ratio": args.overdue_ratio,
+        "late_return_ratio": args.late_return_ratio,
+        "chunk_size": args.chunk_size,
+        # Hashing is deliberately slow, so every synthetic user shares one hash
+        "password_hash": generate_password_hash(SYNTHETIC_PASSWORD),
+    }
+
+    app = create_app()
+
+    # Use app context
+    with app.app_context():
+        # Drop all existing tables and recreate them
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+        dsn = db.engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        tables = [db.metadata.tables[name] for name in TABLES]
+
+        # Loading into unindexed tables and indexing once is far cheaper than
+        # maintaining every index row by row; likewise foreign keys are
+        # validated in one pass at the end instead of by a trigger per row
+        indexes = [index for table in tables for index in table.indexes]
+        with db.engine.begin() as conn:
+            foreign_keys = conn.exec_driver_sql(
+                "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+                "FROM pg_constraint WHERE contype = 'f' "
+                "AND conrelid = ANY(%(tables)s::regclass[])",
+                {"tables": list(TABLES)},
+            ).all()
+            for table_name, name, _ in foreign_keys:
+                conn.exec_driver_sql(f"ALTER TABLE {table_name} DROP CONSTRAINT {name}")
+            for index in indexes:
+                index.drop(conn)
+
+            # Demo accounts take the first user ids
+            for user_id, (username, email, password, is_admin) in enumerate(
+                DEMO_USERS, 1
+            ):
+                conn.execute(
+                    db.metadata.tables["users"].insert(),
+                    {
+                        "id": user_id,
+                        "username": username,
+                        "email": email,
+                        "password_hash": generate_password_hash(password),
+                        "is_admin": is_admin,
+                    },
+                )
+
+        print("Loading data...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            _load(pool, dsn, "users", len(DEMO_USERS) + 1, users, options)
+            _load(pool, dsn, "books", 1, books, options)
+            _load(pool, dsn, "borrows", 1, args.borrows, options)
+
+        print("Building indexes and constraints...")
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            for table_name, name, definition in foreign_keys:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table_name} ADD CONSTRAINT {name} {definition}"
+                )
+            for table in tables:
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"(SELECT coalesce(max(id), 0) + 1 FROM {table.name}), false)"
+                )
+
+        print("Posting fines to the ledger...")
+        with db.engine.begin() as conn:
+            for statement in LEDGER_BACKFILL:
+                conn.exec_driver_sql(statement)
+        with Session(db.engine) as session:
+            bump_catalog_version(session)
+            session.commit()
+
+        borrows, amount_cents = run_accrual(db.engine)
+        print(
+            f"  accrued ${amount_cents / 100:,.2f} on {borrows:,} open overdue borrows"
+        )
+
+        with db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.exec_driver_sql("VACUUM ANALYZE")
 
     print("Database seeded successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            regular_user = User(username="john_doe", email="john.doe@example.com")
+            regular_user.set_password("password123")
+            db.session.add(admin_user)
+            db.session.add(regular_user)
+            db.session.commit()
+            client.admin_id = admin_user.id
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _login(client, email, password):
+    response = client.post("/users/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def test_admin_role_is_read_from_token_claims(client):
+    headers = _login(client, "admin@example.com", "adminpassword123")
+    assert client.get("/admin/users", headers=headers).status_code == 200
+
+    # With the role version cached, only the handler's own query runs
+    statements = []
+    with client.application.app_context():
+        engine = db.engine
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/admin/users", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+
+    headers = _login(client, "john.doe@example.com", "password123")
+    assert client.get("/admin/users", headers=headers).status_code == 403
+
+
+def test_role_change_revokes_existing_tokens(client):
+    headers = _login(client, "admin@example.com", "adminpassword123")
+    assert client.get("/admin/users", headers=headers).status_code == 200
+
+    with client.application.app_context():
+        admin_user = db.session.get(User, client.admin_id)
+        admin_user.set_admin(False)
+        # The commit evicts the cached role version
+        db.session.commit()
+
+    assert client.get("/admin/users", headers=headers).status_code == 403
+
+    # Logging in again issues a token with the current role
+    with client.application.app_context():
+        admin_user = db.session.get(User, client.admin_id)
+        admin_user.set_admin(True)
+        db.session.commit()
+
+    assert client.get("/admin/users", headers=headers).status_code == 403
+    headers = _login(client, "admin@example.com", "adminpassword123")
+    assert client.get("/admin/users", headers=headers).status_code == 200
@@ -0,0 +1,274 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from werkzeug.datastructures import Headers
+
+from app import db
+from app.auth import role_claims
+from app.fines import assess_fine
+from app.models import Book, Borrow, User
+
+# The ASGI mode is an optional extra: `poetry install --extras asgi`
+pytest.importorskip("asgiref")
+pytest.importorskip("asyncpg")
+
+from app.asgi import create_asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    asgi_app = create_asgi_app()
+    app = asgi_app.flask_app
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            users = [admin_user]
+            for name in ("john_doe", "jane_doe"):
+                user = User(username=name, email=f"{name}@example.com")
+                user.set_password("password123")
+                users.append(user)
+            db.session.add_all(users)
+            db.session.add_all(
+                [
+                    Book(
+                        title=f"Book {n}",
+                        author="Author",
+                        published_date="2008-08-01",
+                        isbn=f"97801323508{n:02d}",
+                        pages=100 + n,
+                        language="English",
+                    )
+                    for n in range(5)
+                ]
+            )
+            db.session.commit()
+
+            now = datetime.now(timezone.utc)
+            borrows = [
+                Borrow(user_id=2, book_id=1, borrow_date=now - timedelta(days=10)),
+                Borrow(user_id=2, book_id=2, borrow_date=now - timedelta(days=1)),
+                Borrow(user_id=3, book_id=3, borrow_date=now - timedelta(days=9)),
+            ]
+            db.session.add_all(borrows)
+            db.session.commit()
+            assess_fine(db.session, borrows[0], 600)
+            assess_fine(db.session, borrows[2], 400)
+            db.session.commit()
+
+            client.tokens = {
+                "admin": create_access_token(
+                    identity=admin_user.id, additional_claims=role_claims(admin_user)
+                ),
+                "legacy_admin": create_access_token(identity=admin_user.id),
+                "john": create_access_token(identity=2),
+                "jane": create_access_token(identity=3),
+            }
+        client.asgi_app = asgi_app
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+class AsgiResponse:
+    def __init__(self, status, headers, body):
+        self.status_code = status
+        self.headers = headers
+        self.data = body
+
+
+async def _request(asgi_app, method, path, headers=(), body=b""):
+    path, _, query = path.partition("?")
+    if body:
+        headers = [*headers, ("Content-Length", str(len(body)))]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    received = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        return received.pop() if received else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_app(scope, receive, send)
+    start = messages[0]
+    headers = Headers(
+        [(name.decode(), value.decode()) for name, value in start["headers"]]
+    )
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return AsgiResponse(start["status"], headers, body)
+
+
+def _run(asgi_app, *requests):
+    """Send `(method, path, headers)` requests concurrently on one loop."""
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                *(_request(asgi_app, *request) for request in requests)
+            )
+        finally:
+            await asgi_app.aclose()
+
+    return asyncio.run(main())
+
+
+def _auth(client, who):
+    return [("Authorization", f"Bearer {client.tokens[who]}")] if who else []
+
+
+@pytest.mark.parametrize(
+    "path, who",
+    [
+        ("/books/", None),
+        ("/books/?limit=2&sort=-title", None),
+        ("/books/1", None),
+        ("/books/99", None),
+        ("/books/?sort=pages", None),
+        ("/books/?limit=zero", None),
+        ("/books/?fields=title,pages&sort=-title", None),
+        ("/books/?fields=secret", None),
+        ("/books/?language=English&sort=-published_date&limit=2", None),
+        ("/books/?published_from=2008-08-01&published_to=2008-08-31", None),
+        ("/books/?published_from=someday", None),
+        ("/users/borrowed-books", "john"),
+        ("/users/outstanding-fines", "john"),
+        ("/users/outstanding-fines?limit=1", "jane"),
+        ("/users/borrowed-books", None),
+        ("/users/borrowed-books?fields=book_id", "john"),
+        ("/admin/users", "admin"),
+        ("/admin/users", "legacy_admin"),
+        ("/admin/users?fields=username", "admin"),
+        ("/admin/borrowed-books", "admin"),
+        ("/admin/borrowed-books?fields=username,overdue_fine", "admin"),
+        ("/admin/borrowed-books", "john"),
+    ],
+)
+def test_async_views_match_the_wsgi_responses(client, path, who):
+    headers = _auth(client, who)
+    (response,) = _run(client.asgi_app, ("GET", path, headers))
+    expected = client.get(path, headers=dict(headers))
+
+    assert response.status_code == expected.status_code
+    assert response.data == expected.data
+    for header in ("Content-Type", "Link", "ETag", "Last-Modified"):
+        assert response.headers.get(header) == expected.headers.get(header)
+
+
+def test_async_views_follow_the_cursor_links(client):
+    (first,) = _run(client.asgi_app, ("GET", "/books/?limit=2", []))
+    next_url = first.headers["Link"].split(">")[0].lstrip("<")
+    next_path = next_url.removeprefix("http://localhost")
+
+    (second,) = _run(client.asgi_app, ("GET", next_path, []))
+    assert second.status_code == 200
+    assert second.data == client.get(next_path).data
+
+
+def test_async_conditional_requests(client):
+    (response,) = _run(client.asgi_app, ("GET", "/books/", []))
+    etag = response.headers["ETag"]
+
+    client.asgi_app.flask_app.extensions["book_cache"].clear()
+    not_modified = _run(
+        client.asgi_app,
+        ("GET", "/books/", [("If-None-Match", etag)]),
+        ("GET", "/books/2", []),
+    )[0]
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+
+    (book,) = _run(client.asgi_app, ("GET", "/books/2", []))
+    (revalidated,) = _run(
+        client.asgi_app, ("GET", "/books/2", [("If-None-Match", book.headers["ETag"])])
+    )
+    assert revalidated.status_code == 304
+
+
+def test_concurrent_requests_keep_their_own_identity(client):
+    requests = [
+        ("GET", "/users/borrowed-books", _auth(client, who))
+        for who in ("john", "jane") * 10
+    ]
+    responses = _run(client.asgi_app, *requests)
+
+    expected = {
+        who: client.get("/users/borrowed-books", headers=dict(_auth(client, who))).data
+        for who in ("john", "jane")
+    }
+    for (_, _, headers), response in zip(requests, responses):
+        who = "john" if headers == _auth(client, "john") else "jane"
+        assert response.status_code == 200
+        assert response.data == expected[who]
+
+
+def test_other_requests_fall_back_to_flask(client):
+    body = b'{"title": "Dune", "author": "Frank Herbert", "language": "English"}'
+    created, missing = _run(
+        client.asgi_app,
+        ("POST", "/books/", [("Content-Type", "application/json")], body),
+        ("GET", "/nowhere", []),
+    )
+    assert created.status_code == 201
+    assert missing.status_code == 404
+
+    (book,) = _run(client.asgi_app, ("GET", "/books/6", []))
+    assert book.status_code == 200
+    assert b"Dune" in book.data
+
+
+def test_pool_stats_include_the_async_pool(client):
+    async def main():
+        try:
+            await _request(client.asgi_app, "GET", "/books/", [])
+            return await _request(
+                client.asgi_app, "GET", "/admin/pool-stats", _auth(client, "admin")
+            )
+        finally:
+            await client.asgi_app.aclose()
+
+    response = asyncio.run(main())
+    assert response.status_code == 200
+    pools = json.loads(response.data)["pools"]
+    assert pools["async"]["size"] == client.application.config["ASYNC_POOL_SIZE"]
+    assert pools["async"]["checkouts"] >= 1
+    assert pools["async"]["checked_out"] == 0
+
+
+def test_async_views_are_compressed(client):
+    client.asgi_app.flask_app.extensions["compressor"].min_size = 0
+    (identity,) = _run(client.asgi_app, ("GET", "/books/", []))
+    (response,) = _run(
+        client.asgi_app, ("GET", "/books/", [("Accept-Encoding", "gzip")])
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data) == identity.data
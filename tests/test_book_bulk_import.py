@@ -0,0 +1,133 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import Book
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["BULK_INSERT_BATCH_SIZE"] = 2
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            book = Book(
+                title="Clean Code",
+                author="Robert C. Martin",
+                isbn="9780132350884",
+                language="English",
+            )
+            db.session.add(book)
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_bulk_import_json_array(client):
+    rows = [
+        {
+            "title": "The Pragmatic Programmer",
+            "author": "Andy Hunt",
+            "published_date": "1999-10-20",
+            "isbn": "9780201616224",
+            "pages": 352,
+            "language": "English",
+        },
+        {
+            "title": "Clean Code (2nd printing)",
+            "author": "Robert C. Martin",
+            "isbn": "9780132350884",
+            "language": "English",
+        },
+        {"title": "Missing author", "language": "English"},
+        {"title": "Refactoring", "author": "Martin Fowler", "language": "English"},
+        {
+            "title": "Bad date",
+            "author": "Nobody",
+            "published_date": "yesterday",
+            "language": "English",
+        },
+    ]
+    response = client.post("/books/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] == 2
+    assert data["updated"] == 1
+    assert [error["index"] for error in data["errors"]] == [2, 4]
+    assert "'author' is required" in data["errors"][0]["error"]
+
+    with client.application.app_context():
+        assert Book.query.count() == 3
+        book = Book.query.filter_by(isbn="9780132350884").one()
+        assert book.title == "Clean Code (2nd printing)"
+
+
+def test_bulk_import_ndjson_with_repeated_isbn(client):
+    rows = [
+        {"title": "First", "author": "A", "isbn": "1111111111", "language": "English"},
+        {"title": "Second", "author": "A", "isbn": "1111111111", "language": "English"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    response = client.post(
+        "/books/bulk", data=body, content_type="application/x-ndjson"
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] == 1
+    assert data["updated"] == 1
+    assert data["errors"] == [{"index": 2, "error": "Row must be a JSON object"}]
+
+    with client.application.app_context():
+        assert Book.query.filter_by(isbn="1111111111").one().title == "Second"
+
+
+def test_bulk_import_rejects_non_array_body(client):
+    response = client.post("/books/bulk", json={"title": "Not a list"})
+    assert response.status_code == 400
+
+
+def test_bulk_import_checks_values_against_the_columns(client):
+    rows = [
+        {"title": "Huge", "author": "A", "pages": 2**40, "language": "English"},
+        {"title": "Long ISBN", "author": "A", "isbn": "1" * 14, "language": "English"},
+        {"title": "Nul\x00", "author": "A", "language": "English"},
+        {"title": "Fits", "author": "A", "pages": 2**31 - 1, "language": "English"},
+    ]
+    response = client.post("/books/bulk", json=rows)
+    data = response.get_json()
+    assert data["created"] == 1
+    assert [error["index"] for error in data["errors"]] == [0, 1, 2]
+    assert "'pages' must be an integer" in data["errors"][0]["error"]
+    assert "'isbn' must be at most 13 characters" in data["errors"][1]["error"]
+
+
+def test_bulk_import_failed_batch_only_loses_the_failing_rows(client):
+    with client.application.app_context():
+        # A rule only the database knows about, so the row passes validation
+        db.session.execute(
+            text("ALTER TABLE books ADD CONSTRAINT no_drafts CHECK (title <> 'Draft')")
+        )
+        db.session.commit()
+
+    rows = [
+        {"title": "Kept", "author": "A", "language": "English"},
+        {"title": "Draft", "author": "A", "language": "English"},
+        {"title": "Also kept", "author": "A", "language": "English"},
+        {"title": "No language", "author": "A"},
+    ]
+    response = client.post("/books/bulk", json=rows)
+    data = response.get_json()
+    assert data["created"] == 2
+    assert data["errors"] == [
+        {"index": 1, "error": "Row could not be stored"},
+        {"index": 3, "error": "'language' is required"},
+    ]
@@ -0,0 +1,172 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.cache import TTLCache
+from app.models import Book, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            db.session.add(admin_user)
+            db.session.add_all(
+                [
+                    Book(
+                        title="Clean Code",
+                        author="Robert C. Martin",
+                        isbn="9780132350884",
+                        language="English",
+                    ),
+                    Book(
+                        title="Refactoring", author="Martin Fowler", language="English"
+                    ),
+                ]
+            )
+            db.session.commit()
+
+            client.admin_access_token = create_access_token(identity=admin_user.id)
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _get(client, url, **kwargs):
+    """GET `url` and return the response with the number of queries it ran."""
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.get(url, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return response, len(statements)
+
+
+def test_repeated_reads_are_served_from_cache(client):
+    first, queries = _get(client, "/books/1")
+    assert queries == 1
+
+    second, queries = _get(client, "/books/1")
+    assert queries == 0
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["Last-Modified"] == first.headers["Last-Modified"]
+
+    # A cached entry answers conditional requests too
+    response, queries = _get(
+        client, "/books/1", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    assert queries == 0
+
+    # Misses are not cached
+    assert _get(client, "/books/99")[0].status_code == 404
+    assert _get(client, "/books/99")[1] == 1
+
+
+@pytest.mark.parametrize(
+    "method, url, body",
+    [
+        ("PUT", "/books/1", {"title": "Clean Code, 2nd edition"}),
+        ("DELETE", "/books/1", None),
+        (
+            "POST",
+            "/books/bulk",
+            [
+                {
+                    "title": "Clean Code, 2nd edition",
+                    "author": "Robert C. Martin",
+                    "language": "English",
+                    "isbn": "9780132350884",
+                }
+            ],
+        ),
+    ],
+)
+def test_writes_invalidate_cached_books(client, method, url, body):
+    client.get("/books/1")
+    assert _get(client, "/books/1")[1] == 0
+
+    assert client.open(url, method=method, json=body).status_code < 300
+
+    response, queries = _get(client, "/books/1")
+    assert queries == 1
+    if method == "DELETE":
+        assert response.status_code == 404
+    else:
+        assert response.get_json()["title"] == "Clean Code, 2nd edition"
+
+
+def test_cache_stats_endpoint(client):
+    client.get("/books/1")
+    client.get("/books/1")
+    client.get("/books/2")
+
+    headers = {"Authorization": f"Bearer {client.admin_access_token}"}
+    response = client.get("/admin/cache-stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.get_json()["book_cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+    assert stats["max_entries"] == client.application.config["BOOK_CACHE_MAX_ENTRIES"]
+
+    assert client.get("/admin/cache-stats").status_code == 401
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=2, ttl=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_set_is_skipped_after_a_concurrent_invalidation():
+    cache = TTLCache(max_entries=10, ttl=60)
+
+    generation = cache.generation
+    cache.invalidate("a")  # a write commits while the value is being read
+    cache.set("a", "stale", generation)
+    assert cache.get("a") is None
+
+    cache.set("a", "fresh", cache.generation)
+    assert cache.get("a") == "fresh"
+
+
+def test_zero_size_disables_the_cache():
+    cache = TTLCache(max_entries=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,183 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.catalog import bump_catalog_version
+from app.models import Book
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            db.session.add_all(
+                [
+                    Book(
+                        title="Clean Code",
+                        author="Robert C. Martin",
+                        isbn="9780132350884",
+                        language="English",
+                    ),
+                    Book(
+                        title="Refactoring", author="Martin Fowler", language="English"
+                    ),
+                ]
+            )
+            # As the migration does for an existing database
+            bump_catalog_version(db.session)
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _statements(client, url, **kwargs):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.get(url, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return response, statements
+
+
+def test_single_book_revalidation(client):
+    response = client.get("/books/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert etag.startswith("W/")
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    # Without a cached copy, the 304 is decided from the version alone
+    client.application.extensions["book_cache"].clear()
+    response, statements = _statements(
+        client, "/books/1", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1
+    assert "books.title" not in statements[0]
+
+    response = client.get("/books/1", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    # Weak comparison applies to If-None-Match
+    assert (
+        client.get(
+            "/books/1", headers={"If-None-Match": etag.removeprefix("W/")}
+        ).status_code
+        == 304
+    )
+    assert client.get("/books/2", headers={"If-None-Match": etag}).status_code == 200
+
+    client.put("/books/1", json={"title": "Clean Code, 2nd edition"})
+    response = client.get("/books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["title"] == "Clean Code, 2nd edition"
+    assert response.headers["ETag"] != etag
+
+
+def test_book_list_revalidation(client):
+    response = client.get("/books/?limit=1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    response, statements = _statements(
+        client, "/books/?limit=1", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert len(statements) == 1
+    assert "catalog_version" in statements[0]
+
+    # Other pages and orders are different representations
+    other = client.get("/books/?limit=1&sort=-id")
+    assert other.headers["ETag"] != etag
+    assert (
+        client.get(
+            "/books/?limit=1&sort=-id", headers={"If-None-Match": etag}
+        ).status_code
+        == 200
+    )
+
+
+@pytest.mark.parametrize(
+    "method, url, body",
+    [
+        (
+            "POST",
+            "/books/",
+            {"title": "Dune", "author": "Frank Herbert", "language": "English"},
+        ),
+        ("PUT", "/books/2", {"pages": 448}),
+        ("DELETE", "/books/2", None),
+        (
+            "POST",
+            "/books/bulk",
+            [
+                {
+                    "title": "Clean Code",
+                    "author": "Bob",
+                    "language": "English",
+                    "isbn": "9780132350884",
+                }
+            ],
+        ),
+    ],
+)
+def test_catalog_writes_change_the_list_etag(client, method, url, body):
+    etag = client.get("/books/").headers["ETag"]
+
+    response = client.open(url, method=method, json=body)
+    assert response.status_code < 300
+
+    response = client.get("/books/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_bulk_upsert_bumps_book_version(client):
+    etag = client.get("/books/1").headers["ETag"]
+    client.post(
+        "/books/bulk",
+        json=[
+            {
+                "title": "Clean Code",
+                "author": "Bob",
+                "language": "English",
+                "isbn": "9780132350884",
+            }
+        ],
+    )
+    with client.application.app_context():
+        assert db.session.get(Book, 1).version == 2
+    assert client.get("/books/1", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_unchanged_update_keeps_etags(client):
+    list_etag = client.get("/books/").headers["ETag"]
+    book_etag = client.get("/books/2").headers["ETag"]
+
+    assert client.put("/books/2", json={"title": "Refactoring"}).status_code == 200
+
+    assert (
+        client.get("/books/", headers={"If-None-Match": list_etag}).status_code == 304
+    )
+    assert (
+        client.get("/books/2", headers={"If-None-Match": book_etag}).status_code == 304
+    )
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import create_app, db
+from app.models import Book
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    # Force several fetch batches so chunking is exercised
+    app.config["EXPORT_BATCH_SIZE"] = 2
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            for i in range(5):
+                db.session.add(
+                    Book(
+                        title=f"Book {i}",
+                        author="Author, Jr.",
+                        isbn=f"97800000000{i:02d}",
+                        language="English",
+                    )
+                )
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_export_books_ndjson(client):
+    response = client.get("/books/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["title"] for row in rows] == [f"Book {i}" for i in range(5)]
+    assert rows[0]["isbn"] == "9780000000000"
+
+
+def test_export_books_csv(client):
+    response = client.get("/books/export?format=csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert rows[4]["title"] == "Book 4"
+    assert rows[4]["author"] == "Author, Jr."
+
+
+def test_export_books_unknown_format(client):
+    response = client.get("/books/export?format=xml")
+    assert response.status_code == 400
@@ -0,0 +1,207 @@
+import pytest
+from sqlalchemy import event, text
+
+from app import create_app, db
+from app.models import Book
+
+# Rows in the catalog the query plans are checked against, enough for the
+# planner to prefer an index to a sequential scan on its own
+LARGE_CATALOG_SIZE = 20000
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            db.session.add_all(
+                [
+                    Book(
+                        title="Clean Code",
+                        author="Robert C. Martin",
+                        published_date="2008-08-01",
+                        language="English",
+                    ),
+                    Book(
+                        title="The Clean Coder",
+                        author="Robert C. Martin",
+                        published_date="2011-05-13",
+                        language="English",
+                    ),
+                    Book(
+                        title="Refactoring",
+                        author="Martin Fowler",
+                        published_date="1999-07-08",
+                        language="English",
+                    ),
+                    Book(
+                        title="Codigo limpio",
+                        author="Robert C. Martin",
+                        published_date="2012-01-01",
+                        language="Spanish",
+                    ),
+                    Book(
+                        title="Untitled draft",
+                        author="Martin Fowler",
+                        published_date=None,
+                        language="English",
+                    ),
+                ]
+            )
+            db.session.commit()
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _titles(response):
+    assert response.status_code == 200
+    return [book["title"] for book in response.get_json()]
+
+
+def test_filter_by_language_and_author(client):
+    assert _titles(client.get("/books/?language=Spanish")) == ["Codigo limpio"]
+    assert _titles(client.get("/books/?language=English&author=Robert C. Martin")) == [
+        "Clean Code",
+        "The Clean Coder",
+    ]
+    assert _titles(client.get("/books/?author=Nobody")) == []
+
+
+def test_filter_by_published_range(client):
+    response = client.get("/books/?published_from=2008-08-01&published_to=2011-12-31")
+    assert _titles(response) == ["Clean Code", "The Clean Coder"]
+
+    # Books without a published date match no range
+    response = client.get("/books/?published_to=2000-01-01")
+    assert _titles(response) == ["Refactoring"]
+
+
+def test_sort_by_published_date(client):
+    response = client.get("/books/?sort=published_date")
+    assert _titles(response) == [
+        "Untitled draft",
+        "Refactoring",
+        "Clean Code",
+        "The Clean Coder",
+        "Codigo limpio",
+    ]
+
+    response = client.get("/books/?sort=-published_date&author=Martin Fowler")
+    assert _titles(response) == ["Refactoring", "Untitled draft"]
+
+
+def test_published_date_pages_follow_the_cursor(client):
+    seen = []
+    url = "/books/?sort=-published_date&limit=2&language=English"
+    while url:
+        response = client.get(url)
+        seen += _titles(response)
+        link = response.headers.get("Link", "")
+        url = link.split(">")[0].lstrip("<") if 'rel="next"' in link else None
+    assert seen == ["The Clean Coder", "Clean Code", "Refactoring", "Untitled draft"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["published_from=yesterday", "published_to=2020-13-01", "sort=published"],
+)
+def test_invalid_filters_are_rejected(client, query):
+    response = client.get(f"/books/?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def _fill_catalog(client):
+    """Bulk load a large catalog: mostly English, 2000 authors, 60 years of dates."""
+    with client.application.app_context():
+        db.session.execute(
+            text(
+                "INSERT INTO books (title, author, language, published_date) "
+                "SELECT 'Book ' || n, 'Author ' || (n % 2000), "
+                "CASE WHEN n % 4 > 0 THEN 'English' ELSE 'Language ' || n % 400 END, "
+                "CASE WHEN n % 10 = 0 THEN NULL "
+                "ELSE DATE '1960-01-01' + (n * 7919) % 21900 END "
+                "FROM generate_series(1, :rows) AS n"
+            ),
+            {"rows": LARGE_CATALOG_SIZE},
+        )
+        db.session.commit()
+        db.session.execute(text("ANALYZE books"))
+        db.session.commit()
+
+
+def _plan(client, url):
+    """Run a request and EXPLAIN the page query it sent to the database."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM books" in statement and "LIMIT" in statement:
+            statements.append((statement, parameters))
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    ((statement, parameters),) = statements
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "url, index",
+    [
+        ("/books/?language=Language 8", "ix_books_language_id"),
+        ("/books/?language=Language 8&sort=title", "ix_books_language_id"),
+        ("/books/?author=Author 42", "ix_books_author_id"),
+        ("/books/?author=Author 42&sort=-title", "ix_books_author_id"),
+        # A common language is read in sort order until the page is full
+        (
+            "/books/?language=English&sort=-published_date",
+            "ix_books_published_order_id",
+        ),
+        (
+            "/books/?language=English&author=Author 5&published_from=2000-01-01",
+            "ix_books_author_id",
+        ),
+        ("/books/?sort=published_date", "ix_books_published_order_id"),
+        ("/books/?sort=-published_date&limit=10", "ix_books_published_order_id"),
+        (
+            "/books/?published_from=1990-01-01&published_to=1990-03-31",
+            "ix_books_published_order_id",
+        ),
+        (
+            "/books/?published_from=2001-06-01&published_to=2001-06-30&sort=title",
+            "ix_books_published_order_id",
+        ),
+    ],
+)
+def test_filters_and_sorts_are_index_scans(client, url, index):
+    _fill_catalog(client)
+    plan = _plan(client, url)
+    assert "Seq Scan" not in plan
+    assert index in plan
+
+
+def test_published_date_cursor_is_an_index_range_scan(client):
+    _fill_catalog(client)
+    response = client.get("/books/?sort=published_date&limit=5")
+    next_url = response.headers["Link"].split(">")[0].lstrip("<")
+
+    plan = _plan(client, next_url)
+    assert "Seq Scan" not in plan
+    assert "Index Cond" in plan
+    assert "ix_books_published_order_id" in plan
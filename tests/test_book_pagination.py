@@ -0,0 +1,88 @@
+import re
+
+import pytest
+
+from app import create_app, db
+from app.models import Book
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["PAGINATION_MAX_LIMIT"] = 3
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            titles = ["Refactoring", "Clean Code", "Dune", "Algorithms", "Emma"]
+            for title in titles:
+                db.session.add(Book(title=title, author="Author", language="English"))
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _links(response):
+    return dict(
+        (rel, url)
+        for url, rel in re.findall(
+            r'<([^>]+)>; rel="(\w+)"', response.headers.get("Link", "")
+        )
+    )
+
+
+def test_paginate_books_forward_and_back(client):
+    response = client.get("/books/?limit=2&sort=title")
+    assert response.status_code == 200
+    assert [book["title"] for book in response.get_json()] == [
+        "Algorithms",
+        "Clean Code",
+    ]
+    links = _links(response)
+    assert "prev" not in links
+
+    response = client.get(links["next"])
+    assert [book["title"] for book in response.get_json()] == ["Dune", "Emma"]
+    links = _links(response)
+
+    last_page = client.get(links["next"])
+    assert [book["title"] for book in last_page.get_json()] == ["Refactoring"]
+    assert "next" not in _links(last_page)
+
+    response = client.get(links["prev"])
+    assert [book["title"] for book in response.get_json()] == [
+        "Algorithms",
+        "Clean Code",
+    ]
+    assert "prev" not in _links(response)
+
+
+def test_paginate_books_descending(client):
+    response = client.get("/books/?limit=2&sort=-id")
+    assert [book["id"] for book in response.get_json()] == [5, 4]
+
+    response = client.get(_links(response)["next"])
+    assert [book["id"] for book in response.get_json()] == [3, 2]
+
+
+def test_limit_is_capped(client):
+    response = client.get("/books/?limit=1000")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 3
+
+
+def test_invalid_page_requests(client):
+    assert client.get("/books/?limit=0").status_code == 400
+    assert client.get("/books/?limit=abc").status_code == 400
+    assert client.get("/books/?sort=pages").status_code == 400
+    assert client.get("/books/?cursor=not-a-cursor").status_code == 400
+
+    # A cursor issued for one sort order cannot be replayed against another
+    response = client.get("/books/?limit=2&sort=title")
+    cursor = re.search(r"cursor=([^&>]+)", response.headers["Link"]).group(1)
+    assert client.get(f"/books/?sort=id&cursor={cursor}").status_code == 400
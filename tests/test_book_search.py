@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+from app import create_app, db
+from app.models import Book
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            books = [
+                ("The Pragmatic Programmer", "Andy Hunt"),
+                ("Clean Code", "Robert C. Martin"),
+                ("Programming Pearls", "Jon Bentley"),
+                ("Refactoring", "Martin Fowler"),
+                ("Clean Architecture", "Robert C. Martin"),
+            ]
+            for title, author in books:
+                db.session.add(Book(title=title, author=author, language="English"))
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_search_books_by_title_and_author(client):
+    response = client.get("/books/search?q=clean")
+    assert response.status_code == 200
+    titles = [book["title"] for book in response.get_json()]
+    assert sorted(titles) == ["Clean Architecture", "Clean Code"]
+
+    # Stemming matches "programmers" against "programmer"
+    response = client.get("/books/search?q=programmers")
+    titles = [book["title"] for book in response.get_json()]
+    assert titles == ["The Pragmatic Programmer"]
+
+
+def test_search_ranks_title_matches_first(client):
+    client.post(
+        "/books/",
+        json={"title": "Martin Eden", "author": "Jack London", "language": "English"},
+    )
+    response = client.get("/books/search?q=martin")
+    titles = [book["title"] for book in response.get_json()]
+    assert titles[0] == "Martin Eden"
+    # The author matches are equally ranked and tie-broken by id
+    assert titles[1:] == ["Clean Architecture", "Refactoring", "Clean Code"]
+
+
+def test_search_pagination(client):
+    response = client.get("/books/search?q=martin&limit=2")
+    first_page = [book["title"] for book in response.get_json()]
+    assert len(first_page) == 2
+
+    next_url = re.search(r'<([^>]+)>; rel="next"', response.headers["Link"]).group(1)
+    response = client.get(next_url)
+    second_page = [book["title"] for book in response.get_json()]
+    assert len(second_page) == 1
+    assert set(first_page).isdisjoint(second_page)
+
+
+def test_search_requires_query(client):
+    assert client.get("/books/search").status_code == 400
+    assert client.get("/books/search?q=%20").status_code == 400
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Book, Borrow, User
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+        book = Book(title="Clean Code", author="Robert C. Martin", language="English")
+        db.session.add(book)
+        users = [
+            User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x")
+            for i in range(8)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+
+        app.access_tokens = [create_access_token(identity=user.id) for user in users]
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_concurrent_borrows_of_one_book(app):
+    barrier = threading.Barrier(len(app.access_tokens))
+    statuses = []
+
+    def borrow(token):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(
+            "/books/1/borrow", headers={"Authorization": f"Bearer {token}"}
+        )
+        statuses.append(response.status_code)
+
+    threads = [
+        threading.Thread(target=borrow, args=(token,)) for token in app.access_tokens
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200] + [400] * (len(app.access_tokens) - 1)
+    with app.app_context():
+        assert Borrow.query.filter_by(book_id=1, return_date=None).count() == 1
+
+
+def test_borrow_non_existent_book(app):
+    client = app.test_client()
+    response = client.post(
+        "/books/999/borrow",
+        headers={"Authorization": f"Bearer {app.access_tokens[0]}"},
+    )
+    assert response.status_code == 404
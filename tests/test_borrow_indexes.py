@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.fines import assess_fine
+from app.models import Book, Borrow, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            test_user = User(username="john_doe", email="john.doe@example.com")
+            test_user.set_password("password123")
+            db.session.add(test_user)
+            book1 = Book(
+                title="Clean Code", author="Robert C. Martin", language="English"
+            )
+            book2 = Book(
+                title="Refactoring", author="Martin Fowler", language="English"
+            )
+            db.session.add_all([book1, book2])
+            db.session.commit()
+
+            db.session.add_all(
+                [
+                    Borrow(user_id=test_user.id, book_id=book1.id),
+                    Borrow(
+                        user_id=test_user.id,
+                        book_id=book2.id,
+                        borrow_date=datetime.now(timezone.utc) - timedelta(days=20),
+                        return_date=datetime.now(timezone.utc) - timedelta(days=2),
+                    ),
+                ]
+            )
+            db.session.commit()
+            assess_fine(db.session, db.session.get(Borrow, 2), 2200)
+            db.session.commit()
+
+            client.access_token = create_access_token(identity=test_user.id)
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _plans(client, method, url, **kwargs):
+    """Run a request and return the query plans of its borrow and fine queries.
+
+    Sequential scans are disabled while planning so the plan shows whether an
+    index can serve the statement, independent of the tiny test table.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if (
+            "borrows" in statement or "fine_ledger" in statement
+        ) and not statement.lstrip().startswith("EXPLAIN"):
+            statements.append((statement, parameters))
+
+    with client.application.app_context():
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.open(
+                url,
+                method=method,
+                headers={"Authorization": f"Bearer {client.access_token}"},
+                **kwargs,
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        assert response.status_code == 200
+
+        plans = []
+        with engine.begin() as conn:
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plans.append("\n".join(row[0] for row in rows))
+    return plans
+
+
+@pytest.mark.parametrize(
+    "method, url, body, indexes",
+    [
+        ("GET", "/users/borrowed-books", None, ["ix_borrows_open_user_id"]),
+        ("GET", "/users/outstanding-fines", None, ["ix_fine_ledger_user_id_id"]),
+        ("POST", "/users/pay-fine", {"book_id": 2}, ["ix_borrows_user_id_book_id"]),
+        # Any of these narrows the lookup to a handful of rows
+        (
+            "POST",
+            "/books/1/return",
+            None,
+            [
+                "ix_borrows_open_book_id",
+                "ix_borrows_open_user_id",
+                "ix_borrows_user_id_book_id",
+            ],
+        ),
+    ],
+)
+def test_borrow_queries_use_indexes(client, method, url, body, indexes):
+    plans = _plans(client, method, url, json=body)
+    assert plans
+    assert not any("Seq Scan on borrows" in plan for plan in plans)
+    assert any(index in plan for plan in plans for index in indexes)
@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Book, Borrow, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            test_user = User(username="john_doe", email="john.doe@example.com")
+            test_user.set_password("password123")
+            db.session.add(admin_user)
+            db.session.add(test_user)
+            db.session.commit()
+
+            client.user_id = test_user.id
+            client.admin_access_token = create_access_token(identity=admin_user.id)
+            client.access_token = create_access_token(identity=test_user.id)
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _add_borrows(client, count):
+    with client.application.app_context():
+        for i in range(count):
+            book = Book(title=f"Book {i}", author="Author", language="English")
+            db.session.add(book)
+            db.session.flush()
+            db.session.add(
+                Borrow(
+                    user_id=client.user_id,
+                    book_id=book.id,
+                    borrow_date=datetime.now(timezone.utc) - timedelta(days=20),
+                    overdue_fine=2.0 if i % 2 else 0.0,
+                )
+            )
+        db.session.commit()
+
+
+@contextmanager
+def _count_queries(client):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.parametrize(
+    "url, token_attr",
+    [
+        ("/admin/borrowed-books", "admin_access_token"),
+        ("/users/borrowed-books", "access_token"),
+        ("/users/outstanding-fines", "access_token"),
+    ],
+)
+def test_borrow_listing_query_count_is_constant(client, url, token_attr):
+    headers = {"Authorization": f"Bearer {getattr(client, token_attr)}"}
+
+    _add_borrows(client, 2)
+    with _count_queries(client) as few_rows:
+        assert client.get(url, headers=headers).status_code == 200
+
+    _add_borrows(client, 20)
+    with _count_queries(client) as many_rows:
+        assert client.get(url, headers=headers).status_code == 200
+
+    assert len(many_rows) == len(few_rows)
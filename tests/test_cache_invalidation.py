@@ -0,0 +1,146 @@
+import time
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy.orm import Session
+
+from app import create_app, db
+from app.invalidation import MAX_KEYS_PER_NOTIFICATION, notify_invalidation
+from app.models import Book, User
+from config.config import Config
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Two app instances standing in for two gunicorn workers."""
+    monkeypatch.setattr(Config, "CACHE_INVALIDATION_LISTENER", True)
+    apps = [create_app(), create_app()]
+    for app in apps:
+        app.config["TESTING"] = True
+
+    with apps[0].app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+        user = User(username="john_doe", email="john.doe@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.add_all(
+            [
+                Book(title="Clean Code", author="Robert C. Martin", language="English"),
+                Book(title="Refactoring", author="Martin Fowler", language="English"),
+            ]
+        )
+        db.session.commit()
+
+    for app in apps:
+        assert app.extensions["invalidation_listener"].ready.wait(5)
+
+    yield [app.test_client() for app in apps]
+
+    for app in apps:
+        app.extensions["invalidation_listener"].stop()
+    with apps[0].app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def _cached(client, book_id):
+    return book_id in client.application.extensions["book_cache"]._entries
+
+
+def test_book_update_evicts_other_workers(workers):
+    worker_a, worker_b = workers
+    assert worker_b.get("/books/1").get_json()["title"] == "Clean Code"
+    assert _cached(worker_b, 1)
+
+    worker_a.put("/books/1", json={"title": "Clean Code, 2nd edition"})
+
+    assert _wait_until(lambda: not _cached(worker_b, 1))
+    assert worker_b.get("/books/1").get_json()["title"] == "Clean Code, 2nd edition"
+
+
+def test_notifications_are_sent_only_on_commit(workers):
+    worker_a, worker_b = workers
+    worker_b.get("/books/1")
+    worker_b.get("/books/2")
+
+    with worker_a.application.app_context():
+        with Session(db.engine) as session:
+            notify_invalidation(session, "books", [1])
+            session.rollback()
+        with Session(db.engine) as session:
+            notify_invalidation(session, "books", [2])
+            session.commit()
+
+    # Notifications arrive in commit order, so once 2 is gone the rolled
+    # back invalidation of 1 would have arrived too
+    assert _wait_until(lambda: not _cached(worker_b, 2))
+    assert _cached(worker_b, 1)
+
+
+def test_large_invalidations_flush_the_cache(workers):
+    worker_a, worker_b = workers
+    worker_b.get("/books/1")
+
+    with worker_a.application.app_context():
+        with Session(db.engine) as session:
+            keys = range(1000, 1001 + MAX_KEYS_PER_NOTIFICATION)
+            notify_invalidation(session, "books", keys)
+            session.commit()
+
+    assert _wait_until(lambda: not _cached(worker_b, 1))
+
+
+def test_profile_deletion_evicts_role_versions(workers):
+    worker_a, worker_b = workers
+    role_versions = worker_b.application.extensions["role_versions"]
+    with worker_b.application.app_context():
+        assert role_versions.get(1) == 0
+        token = create_access_token(identity=1)
+    assert 1 in role_versions._entries
+
+    response = worker_a.delete(
+        "/users/profile", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 204
+
+    assert _wait_until(lambda: 1 not in role_versions._entries)
+
+
+def test_role_change_evicts_role_versions(workers):
+    worker_a, worker_b = workers
+    role_versions = worker_b.application.extensions["role_versions"]
+    with worker_b.application.app_context():
+        assert role_versions.get(1) == 0
+
+    with worker_a.application.app_context():
+        user = db.session.get(User, 1)
+        user.set_admin(True)
+        db.session.commit()
+
+    assert _wait_until(lambda: 1 not in role_versions._entries)
+    with worker_b.application.app_context():
+        assert role_versions.get(1) == 1
+
+
+def test_invalid_messages_are_ignored(workers):
+    listener = workers[0].application.extensions["invalidation_listener"]
+    listener.handle("not json")
+    listener.handle('{"cache": "unknown", "keys": [1]}')
+    assert listener.ready.is_set()
+
+
+def test_listener_is_opt_in():
+    app = create_app()
+    assert "invalidation_listener" not in app.extensions
@@ -0,0 +1,170 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.fines import ACCRUAL_LOCK_ID, FineAccrualScheduler, accrue_fines, run_accrual
+from app.models import Book, Borrow, FineBalance, FineLedgerEntry, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            users = [
+                User(username=name, email=f"{name}@example.com")
+                for name in ("john_doe", "jane_doe")
+            ]
+            for user in users:
+                user.set_password("password123")
+            books = [
+                Book(title=f"Book {i}", author="Author", language="English")
+                for i in range(5)
+            ]
+            db.session.add_all(users + books)
+            db.session.commit()
+
+            now = datetime.now(timezone.utc)
+            db.session.add_all(
+                [
+                    # 10 and 3 days overdue, 3 days into the borrowing period
+                    Borrow(user_id=1, book_id=1, borrow_date=now - timedelta(days=17)),
+                    Borrow(user_id=1, book_id=2, borrow_date=now - timedelta(days=10)),
+                    Borrow(user_id=2, book_id=3, borrow_date=now - timedelta(days=3)),
+                    # 60 days overdue
+                    Borrow(user_id=2, book_id=4, borrow_date=now - timedelta(days=67)),
+                    # Returned late and already fined
+                    Borrow(
+                        user_id=2,
+                        book_id=5,
+                        borrow_date=now - timedelta(days=30),
+                        return_date=now - timedelta(days=20),
+                        overdue_fine=6.0,
+                        assessed_fine_cents=600,
+                    ),
+                ]
+            )
+            db.session.commit()
+
+            client.now = now
+            client.access_token = create_access_token(identity=1)
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _accrue(client, now=None, batch_size=2):
+    with client.application.app_context():
+        with db.engine.connect() as connection:
+            return accrue_fines(connection, now or client.now, batch_size)
+
+
+def _state(client):
+    with client.application.app_context():
+        borrows = {
+            borrow.book_id: (borrow.assessed_fine_cents, borrow.overdue_fine)
+            for borrow in db.session.scalars(db.select(Borrow))
+        }
+        balances = dict(
+            db.session.execute(
+                db.select(FineBalance.user_id, FineBalance.balance_cents)
+            ).all()
+        )
+        entries = db.session.scalar(db.select(db.func.count(FineLedgerEntry.id)))
+        return borrows, balances, entries
+
+
+def test_accrues_open_overdue_borrows(client):
+    assert _accrue(client) == (3, 2000 + 600 + 12000)
+
+    borrows, balances, entries = _state(client)
+    assert borrows == {
+        1: (2000, 20.0),
+        2: (600, 6.0),
+        3: (0, 0.0),
+        4: (12000, 120.0),
+        5: (600, 6.0),
+    }
+    assert balances == {1: 2600, 2: 12000}
+    assert entries == 3
+
+
+def test_accrual_is_idempotent_and_incremental(client):
+    _accrue(client)
+    before = _state(client)
+
+    # Re-running at the same moment changes nothing
+    assert _accrue(client) == (0, 0)
+    assert _state(client) == before
+
+    # Two days later only the two new days are posted per overdue borrow
+    assert _accrue(client, client.now + timedelta(days=2)) == (3, 3 * 400)
+    borrows, balances, entries = _state(client)
+    assert borrows[1] == (2400, 24.0)
+    assert balances == {1: 2600 + 800, 2: 12000 + 400}
+    assert entries == 6
+
+
+def test_return_after_accrual_charges_only_the_remainder(client):
+    # Accrued as of yesterday, returned today
+    _accrue(client, client.now - timedelta(days=1))
+    assert _state(client)[0][1] == (1800, 18.0)
+
+    response = client.post(
+        "/books/1/return", headers={"Authorization": f"Bearer {client.access_token}"}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["overdue_fine"] == 20.0
+
+    borrows, balances, _ = _state(client)
+    assert borrows[1] == (2000, 20.0)
+    assert balances[1] == 2000 + 400
+
+
+def test_accrue_command(client):
+    runner = client.application.test_cli_runner()
+
+    result = runner.invoke(args=["fines", "accrue", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    assert "on 3 borrows" in result.output
+
+    result = runner.invoke(args=["fines", "accrue"])
+    assert "$0.00 in fines on 0 borrows" in result.output
+
+
+def test_accrual_skips_while_another_run_holds_the_lock(client):
+    with client.application.app_context():
+        with db.engine.connect() as other:
+            other.execute(db.select(db.func.pg_advisory_lock(ACCRUAL_LOCK_ID)))
+            assert run_accrual(db.engine) is None
+            other.execute(db.select(db.func.pg_advisory_unlock(ACCRUAL_LOCK_ID)))
+
+        assert run_accrual(db.engine) is not None
+
+    result = client.application.test_cli_runner().invoke(args=["fines", "accrue"])
+    assert result.exit_code == 0
+
+
+def test_scheduler_accrues_in_the_background_until_stopped(client):
+    client.application.config["FINE_ACCRUAL_INTERVAL"] = 0.05
+    scheduler = FineAccrualScheduler(client.application)
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 5
+        while _state(client)[2] < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+    assert _state(client)[2] == 3
+    assert not scheduler._thread.is_alive()
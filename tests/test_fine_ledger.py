@@ -0,0 +1,133 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Book, Borrow, FineBalance, FineLedgerEntry, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["PAGINATION_DEFAULT_LIMIT"] = 2
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            test_user = User(username="john_doe", email="john.doe@example.com")
+            test_user.set_password("securepassword123")
+            db.session.add(test_user)
+            books = [
+                Book(title=title, author="Author", language="English")
+                for title in ["Clean Code", "Refactoring", "Dune"]
+            ]
+            db.session.add_all(books)
+            db.session.commit()
+
+            # 10, 5 and 0 days overdue considering BORROWING_PERIOD_DAYS = 7
+            for book, days in zip(books, [17, 12, 3]):
+                db.session.add(
+                    Borrow(
+                        user_id=test_user.id,
+                        book_id=book.id,
+                        borrow_date=datetime.now(timezone.utc) - timedelta(days=days),
+                    )
+                )
+            db.session.commit()
+
+            client.user_id = test_user.id
+            client.access_token = create_access_token(identity=test_user.id)
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _auth(client):
+    return {"Authorization": f"Bearer {client.access_token}"}
+
+
+def _balance(client):
+    with client.application.app_context():
+        balance = db.session.get(FineBalance, client.user_id)
+        return balance.balance_cents if balance else 0
+
+
+def test_return_and_payment_are_posted_to_the_ledger(client):
+    for book_id in (1, 2, 3):
+        response = client.post(f"/books/{book_id}/return", headers=_auth(client))
+        assert response.status_code == 200
+
+    # On-time returns are not assessed
+    assert _balance(client) == 2000 + 1000
+
+    response = client.post(
+        "/users/pay-fine", json={"book_id": 1}, headers=_auth(client)
+    )
+    assert response.get_json()["paid_amount"] == 20.0
+    assert _balance(client) == 1000
+
+    with client.application.app_context():
+        entries = db.session.scalars(
+            db.select(FineLedgerEntry).order_by(FineLedgerEntry.id)
+        ).all()
+        assert [(e.kind, e.book_id, e.amount_cents) for e in entries] == [
+            ("assessment", 1, 2000),
+            ("assessment", 2, 1000),
+            ("payment", 1, -2000),
+        ]
+        assert sum(e.amount_cents for e in entries) == _balance(client)
+
+    data = client.get("/users/outstanding-fines", headers=_auth(client)).get_json()
+    assert data["total_outstanding_fines"] == 10.0
+
+
+def test_outstanding_fines_are_paginated(client):
+    for book_id in (1, 2):
+        client.post(f"/books/{book_id}/return", headers=_auth(client))
+    client.post("/users/pay-fine", json={"book_id": 1}, headers=_auth(client))
+
+    response = client.get("/users/outstanding-fines", headers=_auth(client))
+    data = response.get_json()
+    assert data["total_outstanding_fines"] == 10.0
+    assert [
+        (f["entry_type"], f["book_title"], f["fine_amount"]) for f in data["fines"]
+    ] == [
+        ("assessment", "Clean Code", 20.0),
+        ("assessment", "Refactoring", 10.0),
+    ]
+
+    next_url = re.search(r'<([^>]+)>; rel="next"', response.headers["Link"]).group(1)
+    data = client.get(next_url, headers=_auth(client)).get_json()
+    assert data["total_outstanding_fines"] == 10.0
+    assert [(f["entry_type"], f["fine_amount"]) for f in data["fines"]] == [
+        ("payment", -20.0)
+    ]
+
+    response = client.get(
+        "/users/outstanding-fines?cursor=bogus", headers=_auth(client)
+    )
+    assert response.status_code == 400
+
+
+def test_ledger_outlives_deleted_borrow(client):
+    client.post("/books/1/return", headers=_auth(client))
+
+    with client.application.app_context():
+        db.session.delete(db.session.get(Borrow, 1))
+        db.session.commit()
+
+        entry = db.session.scalars(db.select(FineLedgerEntry)).one()
+        assert entry.borrow_id is None
+        assert entry.amount_cents == 2000
+
+    data = client.get("/users/outstanding-fines", headers=_auth(client)).get_json()
+    assert data["total_outstanding_fines"] == 20.0
+    assert data["fines"][0]["book_title"] == "Clean Code"
@@ -0,0 +1,64 @@
+import logging
+
+import pytest
+
+from app import create_app, db
+from app.models import Book
+from config.config import Config
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(
+        Config, "INSTRUMENTATION_QUERY_BUDGETS", {"books.get_single_book": 0}
+    )
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            book = Book(
+                title="Clean Code", author="Robert C. Martin", language="English"
+            )
+            db.session.add(book)
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_server_timing_header(client):
+    response = client.get("/books/")
+    assert response.status_code == 200
+
+    server_timing = response.headers["Server-Timing"]
+    assert "db;dur=" in server_timing
+    # The catalog version for the ETag, then the page itself
+    assert 'desc="queries=2"' in server_timing
+    assert "serialize;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+
+def test_request_log_and_query_budget(client, caplog):
+    with caplog.at_level(logging.INFO, logger="app.instrumentation"):
+        assert client.get("/books/").status_code == 200
+        assert client.get("/books/1").status_code == 200
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('"endpoint": "books.get_all_books"' in m for m in messages)
+    warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(warnings) == 1
+    assert '"endpoint": "books.get_single_book"' in warnings[0].getMessage()
+    assert '"budget": 0' in warnings[0].getMessage()
+
+
+def test_instrumentation_is_opt_in():
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get("/")
+    assert "Server-Timing" not in response.headers
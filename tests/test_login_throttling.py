@@ -0,0 +1,152 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import ThrottleBucket, User
+from config.config import Config
+
+
+@pytest.fixture
+def throttle_config(monkeypatch):
+    """Small limits for apps created by the test; restored afterwards."""
+    monkeypatch.setattr(Config, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(Config, "THROTTLE_IP_BURST", 5)
+    monkeypatch.setattr(Config, "THROTTLE_IP_PER_MINUTE", 1)
+    monkeypatch.setattr(Config, "THROTTLE_ACCOUNT_BURST", 2)
+    monkeypatch.setattr(Config, "THROTTLE_ACCOUNT_PER_MINUTE", 1)
+    return monkeypatch
+
+
+def _create_client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+        test_user = User(username="john_doe", email="john.doe@example.com")
+        test_user.set_password("securepassword123")
+        db.session.add(test_user)
+        db.session.commit()
+    return app.test_client()
+
+
+@pytest.fixture
+def client(throttle_config):
+    client = _create_client()
+
+    yield client
+
+    with client.application.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _login(client, email="john.doe@example.com", password="wrongpassword", ip=None):
+    return client.post(
+        "/users/login",
+        json={"email": email, "password": password},
+        environ_base={"REMOTE_ADDR": ip or "10.0.0.1"},
+    )
+
+
+def test_account_limit(client):
+    assert _login(client).status_code == 401
+    assert _login(client, password="securepassword123").status_code == 200
+
+    response = _login(
+        client, email=" John.Doe@example.com", password="securepassword123"
+    )
+    assert response.status_code == 429
+    assert response.get_json()["error"] == "Too many attempts, try again later"
+    # A token a minute, and the refused attempt cost one too
+    assert response.headers["Retry-After"] == "120"
+
+    # The account's limit follows it across addresses
+    assert _login(client, ip="10.0.0.2").status_code == 429
+    assert _login(client, email="jane.doe@example.com").status_code == 401
+
+
+def test_ip_limit(client):
+    for n in range(5):
+        assert _login(client, email=f"user{n}@example.com").status_code == 401
+
+    response = client.post(
+        "/users/register",
+        json={"username": "jane", "email": "jane@example.com", "password": "x"},
+        environ_base={"REMOTE_ADDR": "10.0.0.1"},
+    )
+    assert response.status_code == 429
+
+    assert (
+        _login(client, password="securepassword123", ip="10.0.0.2").status_code == 200
+    )
+
+
+def test_refused_attempts_skip_hashing_and_the_database(client):
+    for _ in range(2):
+        _login(client)
+
+    app = client.application
+    statements = []
+    with app.app_context():
+        event.listen(
+            db.engine, "before_cursor_execute", lambda *args: statements.append(args)
+        )
+
+    def fail(*args):
+        raise AssertionError("hashed a throttled attempt")
+
+    app.extensions["password_hasher"].verify = fail
+    assert _login(client).status_code == 429
+    assert statements == []
+
+
+def test_buckets_refill(throttle_config):
+    throttle_config.setattr(Config, "THROTTLE_ACCOUNT_BURST", 1)
+    throttle_config.setattr(Config, "THROTTLE_ACCOUNT_PER_MINUTE", 1200)
+    client = _create_client()
+    # An unknown account, so that no hashing slows the attempts down
+    email = "nobody@example.com"
+
+    assert _login(client, email=email).status_code == 401
+    response = _login(client, email=email)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    time.sleep(0.15)
+    assert _login(client, email=email).status_code == 401
+    with client.application.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_postgres_store_is_shared_between_processes(throttle_config):
+    throttle_config.setattr(Config, "THROTTLE_STORE", "postgres")
+    worker_a = _create_client()
+    worker_b = create_app().test_client()
+
+    assert _login(worker_a).status_code == 401
+    assert _login(worker_b, ip="10.0.0.2").status_code == 401
+    assert _login(worker_a, ip="10.0.0.3").status_code == 429
+    assert _login(worker_b, email="jane.doe@example.com").status_code == 401
+
+    with worker_a.application.app_context():
+        buckets = {bucket.key: bucket.tokens for bucket in ThrottleBucket.query}
+        db.session.remove()
+        db.drop_all()
+    assert buckets["account:john.doe@example.com"] == pytest.approx(-1, abs=0.01)
+    assert buckets["ip:10.0.0.1"] == pytest.approx(3, abs=0.01)
+
+
+def test_throttling_can_be_disabled(throttle_config):
+    throttle_config.setattr(Config, "THROTTLE_ENABLED", False)
+    client = _create_client()
+    for _ in range(4):
+        assert _login(client).status_code == 401
+    with client.application.app_context():
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,142 @@
+import os
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import User
+from app.passwords import hash_method
+from config.config import Config
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Cheap enough for tests, and unlike the scrypt hash stored below, so
+    # logins have something to upgrade
+    monkeypatch.setattr(Config, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    monkeypatch.setattr(Config, "PASSWORD_HASH_MAX_PENDING", 1)
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            test_user = User(username="john_doe", email="john.doe@example.com")
+            test_user.password_hash = generate_password_hash(
+                "securepassword123", "scrypt"
+            )
+            db.session.add(test_user)
+            db.session.commit()
+        client.hasher = app.extensions["password_hasher"]
+
+        yield client
+
+        client.hasher.shutdown()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _password_hash(client, email):
+    with client.application.app_context():
+        return db.session.query(User).filter_by(email=email).one().password_hash
+
+
+def test_hashing_runs_in_the_process_pool(client):
+    assert client.hasher._run(os.getpid) != os.getpid()
+
+
+def test_register_uses_the_configured_method(client):
+    response = client.post(
+        "/users/register",
+        json={
+            "username": "jane_doe",
+            "email": "jane.doe@example.com",
+            "password": "password456",
+        },
+    )
+    assert response.status_code == 201
+    assert _password_hash(client, "jane.doe@example.com").startswith(
+        "pbkdf2:sha256:1000$"
+    )
+
+    login_data = {"email": "jane.doe@example.com", "password": "password456"}
+    assert client.post("/users/login", json=login_data).status_code == 200
+
+
+def test_login_rehashes_outdated_hashes(client):
+    assert _password_hash(client, "john.doe@example.com").startswith("scrypt:")
+
+    login_data = {"email": "john.doe@example.com", "password": "wrongpassword"}
+    assert client.post("/users/login", json=login_data).status_code == 401
+    assert _password_hash(client, "john.doe@example.com").startswith("scrypt:")
+
+    login_data["password"] = "securepassword123"
+    assert client.post("/users/login", json=login_data).status_code == 200
+    upgraded = _password_hash(client, "john.doe@example.com")
+    assert upgraded.startswith("pbkdf2:sha256:1000$")
+
+    # Up to date hashes are left alone
+    assert client.post("/users/login", json=login_data).status_code == 200
+    assert _password_hash(client, "john.doe@example.com") == upgraded
+
+
+def test_set_password_uses_the_configured_method(client):
+    with client.application.app_context():
+        user = User(username="jane_doe", email="jane.doe@example.com")
+        user.set_password("password456")
+        assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+        assert user.check_password("password456")
+        assert not user.check_password("password123")
+
+
+def test_no_connection_is_held_while_hashing(client):
+    with client.application.app_context():
+        pool = db.engine.pool
+    checked_out = []
+    hasher = client.hasher
+    verify, hash_ = hasher.verify, hasher.hash
+    hasher.verify = lambda *args: checked_out.append(pool.checkedout()) or verify(*args)
+    hasher.hash = lambda *args: checked_out.append(pool.checkedout()) or hash_(*args)
+
+    login_data = {"email": "john.doe@example.com", "password": "securepassword123"}
+    assert client.post("/users/login", json=login_data).status_code == 200
+    response = client.post(
+        "/users/register",
+        json={"username": "jane", "email": "jane@example.com", "password": "x"},
+    )
+    assert response.status_code == 201
+
+    # verify and rehash on login, hash on registration
+    assert checked_out == [0, 0, 0]
+
+
+def test_full_queue_returns_503(client):
+    login_data = {"email": "john.doe@example.com", "password": "securepassword123"}
+
+    # Another request holds the only slot
+    assert client.hasher._slots.acquire(blocking=False)
+    try:
+        response = client.post("/users/login", json=login_data)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+        response = client.post(
+            "/users/register",
+            json={"username": "jane", "email": "jane@example.com", "password": "x"},
+        )
+        assert response.status_code == 503
+    finally:
+        client.hasher._slots.release()
+
+    assert client.post("/users/login", json=login_data).status_code == 200
+
+
+def test_hash_method_defaults():
+    assert hash_method("scrypt") == "scrypt:32768:8:1"
+    assert hash_method("scrypt:16384:8:2") == "scrypt:16384:8:2"
+    assert hash_method("pbkdf2:sha512").startswith("pbkdf2:sha512:")
+    with pytest.raises(ValueError):
+        hash_method("md5")
@@ -4,6 +4,7 @@ import pytest
 from flask_jwt_extended import create_access_token
 
 from app import create_app, db
+from app.fines import assess_fine
 from app.models import Book, Borrow, User
 
 
@@ -39,11 +40,13 @@ def client():
                 borrow_date=datetime.now(timezone.utc)
                 - timedelta(days=17),  # 10 days overdue
                 return_date=datetime.now(timezone.utc) - timedelta(days=1),
-                overdue_fine=20.0,  # 10 days * $2/day
             )
             db.session.add(borrow)
             db.session.commit()
 
+            assess_fine(db.session, borrow, 2000)  # 10 days * $2/day
+            db.session.commit()
+
             access_token = create_access_token(identity=test_user.id)
             client.access_token = access_token
 
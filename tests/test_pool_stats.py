@@ -0,0 +1,106 @@
+import pytest
+import sqlalchemy
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import create_app, db
+from app.auth import role_claims
+from app.models import User
+from app.pool import WAIT_BUCKETS_MS, InstrumentedQueuePool
+from config.config import Config
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            db.session.add(admin_user)
+            db.session.commit()
+
+            client.admin_access_token = create_access_token(
+                identity=admin_user.id, additional_claims=role_claims(admin_user)
+            )
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+@pytest.fixture
+def engine_options(monkeypatch):
+    """Engine options for apps created by the test; restored afterwards."""
+    options = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        "connect_args": dict(Config.SQLALCHEMY_ENGINE_OPTIONS["connect_args"]),
+    }
+    monkeypatch.setattr(Config, "SQLALCHEMY_ENGINE_OPTIONS", options)
+    return options
+
+
+def test_pool_stats_endpoint(client):
+    for _ in range(3):
+        client.get("/books/")
+
+    headers = {"Authorization": f"Bearer {client.admin_access_token}"}
+    response = client.get("/admin/pool-stats", headers=headers)
+    assert response.status_code == 200
+
+    stats = response.get_json()["pools"]["default"]
+    assert stats["size"] == Config.DB_POOL_SIZE
+    assert stats["max_overflow"] == Config.DB_MAX_OVERFLOW
+    # The endpoint's own admin check has returned its connection
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] >= 3
+    assert stats["timeouts"] == 0
+    histogram = stats["wait_ms"]["histogram"]
+    assert [bucket["le"] for bucket in histogram] == [*WAIT_BUCKETS_MS, None]
+    assert sum(bucket["count"] for bucket in histogram) == stats["checkouts"]
+
+    assert client.get("/admin/pool-stats").status_code == 401
+
+
+def test_exhausted_pool_records_timeouts(engine_options):
+    engine_options.update(pool_size=1, max_overflow=0, pool_timeout=1)
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+
+    with engine.connect():
+        with pytest.raises(sqlalchemy.exc.TimeoutError):
+            engine.connect()
+
+    stats = engine.pool.checkout_stats.snapshot()
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms"]["max"] >= 1000
+    # The timed out wait lands in the (1000, 5000] ms bucket
+    assert stats["wait_ms"]["histogram"][7] == {"le": 5000, "count": 1}
+    engine.dispose()
+
+
+def test_connections_carry_the_configured_settings(engine_options):
+    engine_options["connect_args"] = {
+        "application_name": "library-api-test",
+        "options": "-c statement_timeout=1500",
+    }
+    app = create_app()
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.scalar(text("SHOW statement_timeout")) == "1500ms"
+            assert (
+                connection.scalar(text("SHOW application_name")) == "library-api-test"
+            )
+        db.engine.dispose()
@@ -0,0 +1,273 @@
+import time
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth import role_claims
+from app.models import Book, User
+from config.config import Config, _replica_binds
+
+REPLICA_URL = (
+    f"postgresql://{Config.POSTGRES_USER}:{Config.POSTGRES_PASSWORD}"
+    f"@{{host}}/{Config.POSTGRES_DB}"
+)
+# The test database stands in for a replica; nothing listens on port 1
+TEST_DB_HOST = f"{Config.POSTGRES_HOST}:{Config.POSTGRES_PORT}"
+UNREACHABLE_HOST = "localhost:1"
+
+
+def _replica_app(monkeypatch, *hosts, pin_seconds=5):
+    """An app whose replicas are `hosts`; the test database stands in."""
+    monkeypatch.setattr(
+        Config,
+        "SQLALCHEMY_BINDS",
+        _replica_binds(REPLICA_URL, hosts, Config.SQLALCHEMY_ENGINE_OPTIONS, 1),
+    )
+    monkeypatch.setattr(Config, "REPLICA_CHECK_INTERVAL", 0.1)
+    monkeypatch.setattr(Config, "REPLICA_PIN_SECONDS", pin_seconds)
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def apps():
+    """Collects the apps a test creates and stops their health checks."""
+    created = []
+    yield created
+    for app in created:
+        app.extensions["replica_router"].stop()
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def _client(app):
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+        admin_user = User(
+            username="admin_user", email="admin@example.com", is_admin=True
+        )
+        admin_user.set_password("adminpassword123")
+        user = User(username="john_doe", email="john.doe@example.com")
+        user.set_password("password123")
+        db.session.add_all([admin_user, user])
+        db.session.add_all(
+            [
+                Book(title="Clean Code", author="Robert C. Martin", language="English"),
+                Book(title="Refactoring", author="Martin Fowler", language="English"),
+            ]
+        )
+        db.session.commit()
+
+        client = app.test_client()
+        client.headers = {
+            "Authorization": f"Bearer {create_access_token(identity=user.id)}"
+        }
+        client.admin_headers = {
+            "Authorization": "Bearer "
+            + create_access_token(
+                identity=admin_user.id, additional_claims=role_claims(admin_user)
+            )
+        }
+    return client
+
+
+def _count_statements(engine):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # Leave out the health checks
+        if "pg_is_in_recovery" not in statement:
+            statements.append(statement)
+
+    return statements
+
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_no_replicas_configured():
+    app = create_app()
+    assert "replica_router" not in app.extensions
+    with app.app_context():
+        assert list(db.engines) == [None]
+
+
+def test_get_endpoints_read_from_the_replica(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST)
+    apps.append(app)
+    client = _client(app)
+    router = app.extensions["replica_router"]
+    assert router.checked.wait(5)
+
+    with app.app_context():
+        replica_statements = _count_statements(db.engines["replica_0"])
+
+    assert client.get("/books/").status_code == 200
+    assert client.get("/books/1").get_json()["title"] == "Clean Code"
+    assert client.get("/users/profile", headers=client.headers).status_code == 200
+    assert (
+        client.get("/users/borrowed-books", headers=client.headers).status_code == 200
+    )
+    assert client.get("/admin/users", headers=client.admin_headers).status_code == 200
+    assert len(replica_statements) >= 5
+
+    # Writes never touch the replica
+    replica_statements.clear()
+    client.put("/books/2", json={"title": "Refactoring, 2nd edition"})
+    response = client.post("/books/2/borrow", headers=client.headers)
+    assert response.status_code == 200
+    assert not [s for s in replica_statements if "INSERT" in s or "UPDATE" in s]
+
+
+def test_writes_pin_their_reads_to_the_primary(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST, pin_seconds=0.5)
+    apps.append(app)
+    client = _client(app)
+    router = app.extensions["replica_router"]
+    assert router.checked.wait(5)
+
+    with app.app_context():
+        replica_statements = _count_statements(db.engines["replica_0"])
+
+    assert client.post("/books/1/borrow", headers=client.headers).status_code == 200
+    replica_statements.clear()
+
+    # The borrower's reads stay on the primary for the pin
+    response = client.get("/users/borrowed-books", headers=client.headers)
+    assert [book["book_id"] for book in response.get_json()["borrowed_books"]] == [1]
+    assert replica_statements == []
+
+    # Other users' reads still go to the replica
+    assert client.get("/admin/users", headers=client.admin_headers).status_code == 200
+    assert replica_statements
+
+    time.sleep(0.5)
+    replica_statements.clear()
+    client.get("/users/borrowed-books", headers=client.headers)
+    assert replica_statements
+
+
+def test_expired_pins_are_pruned(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST, pin_seconds=0.1)
+    apps.append(app)
+    router = app.extensions["replica_router"]
+
+    # Writes by many users, each read back by no one
+    router.pin(*range(1000))
+    assert len(router._pins) == 1000
+    time.sleep(0.1)
+
+    router.pin("catalog")
+    assert router._pins.keys() == {"catalog"}
+    assert len(router._expiries) == 1
+
+    # A key pinned again keeps its later expiry
+    router.pin(1)
+    router.pin(1)
+    assert router.is_pinned((1,))
+    assert len(router._pins) == 2
+
+
+def test_catalog_changes_pin_book_reads_to_the_primary(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST)
+    apps.append(app)
+    client = _client(app)
+    assert app.extensions["replica_router"].checked.wait(5)
+
+    with app.app_context():
+        replica_statements = _count_statements(db.engines["replica_0"])
+
+    client.put("/books/1", json={"title": "Clean Code, 2nd edition"})
+    replica_statements.clear()
+
+    # A stale replica read must not refill the book cache either
+    assert client.get("/books/1").get_json()["title"] == "Clean Code, 2nd edition"
+    assert client.get("/books/").status_code == 200
+    assert replica_statements == []
+
+
+def test_unreachable_replica_falls_back_to_the_primary(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST, UNREACHABLE_HOST)
+    apps.append(app)
+    client = _client(app)
+    router = app.extensions["replica_router"]
+    assert router.checked.wait(5)
+
+    with app.app_context():
+        down_statements = _count_statements(db.engines["replica_1"])
+
+    for _ in range(4):
+        assert client.get("/books/").status_code == 200
+    assert down_statements == []
+
+    stats = client.get("/admin/pool-stats", headers=client.admin_headers).get_json()
+    assert stats["replicas"]["replica_0"]["healthy"] is True
+    assert stats["replicas"]["replica_0"]["lag_seconds"] == 0
+    assert stats["replicas"]["replica_1"]["healthy"] is False
+    assert stats["replicas"]["replica_1"]["error"] == "OperationalError"
+    assert set(stats["pools"]) == {"default", "replica_0", "replica_1"}
+
+
+def test_reads_retry_on_the_primary_when_a_replica_refuses(monkeypatch, apps):
+    app = _replica_app(monkeypatch, UNREACHABLE_HOST)
+    apps.append(app)
+    client = _client(app)
+    router = app.extensions["replica_router"]
+    assert router.checked.wait(5)
+
+    # The replica goes down between two health checks
+    router.stop()
+    replica = router.replicas[0]
+    replica.healthy = True
+
+    response = client.get("/books/")
+    assert response.status_code == 200
+    assert [book["title"] for book in response.get_json()] == [
+        "Clean Code",
+        "Refactoring",
+    ]
+    assert replica.healthy is False
+
+    replica.healthy = True
+    response = client.get("/users/borrowed-books", headers=client.headers)
+    assert response.status_code == 200
+    assert replica.healthy is False
+
+
+def test_lagging_replica_falls_back_to_the_primary(monkeypatch, apps):
+    app = _replica_app(monkeypatch, TEST_DB_HOST)
+    apps.append(app)
+    client = _client(app)
+    router = app.extensions["replica_router"]
+    assert router.checked.wait(5)
+
+    with app.app_context():
+        replica_statements = _count_statements(db.engines["replica_0"])
+
+    # The standby stops replaying: its lag grows past REPLICA_MAX_LAG
+    monkeypatch.setattr(router, "max_lag", -1)
+    assert _wait_until(lambda: not router.replicas[0].healthy)
+    replica_statements.clear()
+
+    assert client.get("/books/").status_code == 200
+    assert replica_statements == []
+
+    monkeypatch.setattr(router, "max_lag", Config.REPLICA_MAX_LAG)
+    assert _wait_until(lambda: router.replicas[0].healthy)
+    assert client.get("/books/").status_code == 200
+    assert replica_statements
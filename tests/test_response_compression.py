@@ -0,0 +1,165 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Response, request
+
+from app import create_app, db
+from app.models import Book
+from config.config import Config
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["EXPORT_BATCH_SIZE"] = 10
+
+    # Responses no endpoint produces yet
+    @app.route("/test/precompressed")
+    def precompressed():
+        response = Response(gzip.compress(b"x" * 4096), mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+        return response
+
+    @app.route("/test/image")
+    def image():
+        return Response(b"\x89PNG" + b"\0" * 4096, mimetype="image/png")
+
+    # A strong ETag set outside app.conditional
+    @app.route("/test/strong-etag")
+    def strong_etag():
+        response = Response(b"x" * 4096, mimetype="application/json")
+        response.set_etag("abc")
+        return response.make_conditional(request)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            db.session.add_all(
+                [
+                    Book(
+                        title=f"Book {n}",
+                        author="Robert C. Martin",
+                        published_date="2008-08-01",
+                        isbn=f"97801323508{n:02d}",
+                        pages=464,
+                        language="English",
+                    )
+                    for n in range(50)
+                ]
+            )
+            db.session.commit()
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_gzip_list(client):
+    identity = client.get("/books/")
+    assert "Content-Encoding" not in identity.headers
+    assert identity.headers["Vary"] == "Accept-Encoding"
+
+    response = client.get("/books/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert len(response.data) < len(identity.data) / 4
+    assert gzip.decompress(response.data) == identity.data
+
+    # The identity and compressed bodies and their 304s share one weak ETag
+    etag = identity.headers["ETag"]
+    assert etag.startswith("W/")
+    assert response.headers["ETag"] == etag
+    for headers in ({"Accept-Encoding": "gzip"}, {}):
+        not_modified = client.get("/books/", headers={**headers, "If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["ETag"] == etag
+        assert not_modified.headers["Vary"] == "Accept-Encoding"
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/books/1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.get_json()["title"] == "Book 0"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding",
+    ["identity", "gzip;q=0", "compress, deflate", "*;q=0"],
+)
+def test_identity_when_nothing_we_support_is_accepted(client, accept_encoding):
+    response = client.get("/books/", headers={"Accept-Encoding": accept_encoding})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_preferred_codings(client):
+    brotli = pytest.importorskip("brotli")
+    zstandard = pytest.importorskip("zstandard")
+    identity = client.get("/books/").data
+
+    response = client.get("/books/", headers={"Accept-Encoding": "gzip, br, zstd"})
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(response.data) == (
+        identity
+    )
+
+    # The client's qualities come first
+    response = client.get("/books/", headers={"Accept-Encoding": "zstd;q=0.5, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == identity
+
+
+def test_streamed_export_is_compressed_incrementally(client):
+    identity = client.get("/books/export").data
+
+    response = client.get(
+        "/books/export", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    # Each chunk decompresses as it arrives: 50 rows in batches of 10
+    decompressor = zlib.decompressobj(31)
+    chunks = [decompressor.decompress(chunk) for chunk in response.response]
+    response.close()
+    assert len([chunk for chunk in chunks if chunk]) == 5
+    assert b"".join(chunks) == identity
+
+
+def test_strong_etags_are_weakened_for_compressed_responses(client):
+    response = client.get("/test/strong-etag", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == 'W/"abc"'
+    response = client.get(
+        "/test/strong-etag",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"abc"'},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == 'W/"abc"'
+
+    assert client.get("/test/strong-etag").headers["ETag"] == '"abc"'
+
+
+def test_compressed_and_binary_content_passes_through(client):
+    response = client.get("/test/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.data) == b"x" * 4096
+
+    response = client.get("/test/image", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(Config, "COMPRESSION_ENABLED", False)
+    app = create_app()
+    assert "compressor" not in app.extensions
+    response = app.test_client().get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,89 @@
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Book, User
+from app.serializers import ORJSONProvider, Serializer
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            user = User(username="john_doe", email="john.doe@example.com")
+            user.set_password("password123")
+            db.session.add(user)
+            db.session.add(
+                Book(
+                    title="The Pragmatic Programmer",
+                    author="Andy Hunt",
+                    published_date="1999-10-20",
+                    isbn="9780201616224",
+                    pages=352,
+                    language="English",
+                )
+            )
+            db.session.commit()
+
+            client.headers = {
+                "Authorization": f"Bearer {create_access_token(identity=user.id)}"
+            }
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_app_uses_the_orjson_provider(client):
+    assert isinstance(client.application.json, ORJSONProvider)
+
+
+def test_book_is_rendered_with_iso_dates(client):
+    response = client.get("/books/1")
+    assert response.data == (
+        b'{"id":1,"title":"The Pragmatic Programmer","author":"Andy Hunt",'
+        b'"published_date":"1999-10-20","isbn":"9780201616224","pages":352,'
+        b'"cover":null,"language":"English"}\n'
+    )
+    # The list renders each book the same way
+    assert client.get("/books/").get_json() == [response.get_json()]
+
+
+def test_datetimes_carry_their_utc_offset(client):
+    client.post("/books/1/borrow", headers=client.headers)
+
+    response = client.get("/users/borrowed-books", headers=client.headers)
+    (borrow,) = response.get_json()["borrowed_books"]
+    assert list(borrow) == ["book_id", "title", "author", "borrow_date"]
+    assert borrow["borrow_date"].endswith("+00:00")
+
+
+def test_invalid_json_is_rejected(client):
+    response = client.post(
+        "/users/login", data=b"{not json", content_type="application/json"
+    )
+    assert response.status_code == 400
+
+
+def test_serializer_renames_fields():
+    class Row:
+        id = 7
+        title = "Dune"
+
+    serialize = Serializer(("book_id", "id"), "title")
+    assert serialize(Row) == {"book_id": 7, "title": "Dune"}
+    assert serialize.many([Row, Row]) == [{"book_id": 7, "title": "Dune"}] * 2
+
+
+def test_provider_encodes_decimals(client):
+    assert client.application.json.dumps({"fine": Decimal("2.50")}) == '{"fine":"2.50"}'
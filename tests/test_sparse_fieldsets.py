@@ -0,0 +1,214 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Book, Borrow, User
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+            admin_user = User(
+                username="admin_user", email="admin@example.com", is_admin=True
+            )
+            admin_user.set_password("adminpassword123")
+            test_user = User(username="john_doe", email="john.doe@example.com")
+            test_user.set_password("password123")
+            db.session.add_all([admin_user, test_user])
+            db.session.add_all(
+                [
+                    Book(
+                        title=f"Book {n}",
+                        author="Robert C. Martin",
+                        published_date="2008-08-01",
+                        isbn=f"97801323508{n:02d}",
+                        pages=464,
+                        cover="https://example.com/cover.png",
+                        language="English",
+                    )
+                    for n in range(5)
+                ]
+            )
+            db.session.commit()
+
+            db.session.add_all(
+                [
+                    Borrow(
+                        user_id=test_user.id,
+                        book_id=book_id,
+                        borrow_date=datetime.now(timezone.utc) - timedelta(days=1),
+                    )
+                    for book_id in (1, 2)
+                ]
+            )
+            db.session.commit()
+
+            client.admin_headers = {
+                "Authorization": f"Bearer {create_access_token(identity=admin_user.id)}"
+            }
+            client.user_headers = {
+                "Authorization": f"Bearer {create_access_token(identity=test_user.id)}"
+            }
+
+        yield client
+
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+@contextmanager
+def _capture_statements(client):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _select(statements, table):
+    # Skips the primary key lookup of the authenticated user
+    (statement,) = [s for s in statements if f"FROM {table}" in s and "pk_1" not in s]
+    return statement
+
+
+def test_book_list_returns_only_the_requested_fields(client):
+    with _capture_statements(client) as statements:
+        response = client.get("/books/?fields=title, id")
+    assert response.status_code == 200
+    # Fields come back in the listing's own order, whatever order was asked
+    assert response.get_json()[0] == {"id": 1, "title": "Book 0"}
+
+    statement = _select(statements, "books")
+    assert "books.title" in statement
+    assert "books.cover" not in statement
+    assert "books.isbn" not in statement
+
+
+def test_fields_default_to_all(client):
+    (book,) = client.get("/books/?limit=1").get_json()
+    assert list(book) == [
+        "id",
+        "title",
+        "author",
+        "published_date",
+        "isbn",
+        "pages",
+        "cover",
+        "language",
+    ]
+
+
+def test_cursor_links_keep_the_fieldset(client):
+    response = client.get("/books/?fields=title&sort=-title&limit=2")
+    assert response.get_json() == [{"title": "Book 4"}, {"title": "Book 3"}]
+
+    next_url = response.headers["Link"].split(">")[0].lstrip("<")
+    assert "fields=title" in next_url
+    response = client.get(next_url)
+    assert response.get_json() == [{"title": "Book 2"}, {"title": "Book 1"}]
+
+
+def test_search_takes_fields(client):
+    response = client.get("/books/search?q=martin&fields=isbn&limit=1")
+    assert response.status_code == 200
+    (book,) = response.get_json()
+    assert list(book) == ["isbn"]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/books/?fields=title,password",
+        "/books/?fields=",
+        "/books/?fields=,,",
+        "/books/search?q=martin&fields=search_vector",
+    ],
+)
+def test_invalid_fields_are_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_admin_user_list_fields(client):
+    with _capture_statements(client) as statements:
+        response = client.get(
+            "/admin/users?fields=username,is_admin", headers=client.admin_headers
+        )
+    assert response.status_code == 200
+    assert response.get_json()["users"] == [
+        {"username": "admin_user", "is_admin": True},
+        {"username": "john_doe", "is_admin": False},
+    ]
+    statement = _select(statements, "users")
+    assert "password_hash" not in statement
+    assert "users.email" not in statement
+
+    response = client.get(
+        "/admin/users?fields=password_hash", headers=client.admin_headers
+    )
+    assert response.status_code == 400
+
+
+def test_admin_borrow_list_joins_only_what_the_fields_need(client):
+    with _capture_statements(client) as statements:
+        response = client.get(
+            "/admin/borrowed-books?fields=borrow_id,book_id",
+            headers=client.admin_headers,
+        )
+    assert response.get_json()["borrowed_books"] == [
+        {"borrow_id": 1, "book_id": 1},
+        {"borrow_id": 2, "book_id": 2},
+    ]
+    statement = _select(statements, "borrows")
+    assert "JOIN" not in statement
+
+    with _capture_statements(client) as statements:
+        response = client.get(
+            "/admin/borrowed-books?fields=username", headers=client.admin_headers
+        )
+    assert response.get_json()["borrowed_books"] == [{"username": "john_doe"}] * 2
+    statement = _select(statements, "borrows")
+    assert "JOIN users" in statement
+    assert "JOIN books" not in statement
+
+
+def test_user_borrowed_books_fields(client):
+    with _capture_statements(client) as statements:
+        response = client.get(
+            "/users/borrowed-books?fields=book_id", headers=client.user_headers
+        )
+    assert response.get_json()["borrowed_books"] == [{"book_id": 1}, {"book_id": 2}]
+    assert "JOIN" not in _select(statements, "borrows")
+
+    response = client.get(
+        "/users/borrowed-books?fields=title,author", headers=client.user_headers
+    )
+    assert response.get_json()["borrowed_books"][0] == {
+        "title": "Book 0",
+        "author": "Robert C. Martin",
+    }
+
+    response = client.get(
+        "/users/borrowed-books?fields=overdue_fine", headers=client.user_headers
+    )
+    assert response.status_code == 400
@@ -4,6 +4,7 @@ import pytest
 from flask_jwt_extended import create_access_token
 
 from app import create_app, db
+from app.fines import assess_fine
 from app.models import Book, Borrow, User
 
 
@@ -49,7 +50,6 @@ def client():
                 borrow_date=datetime.now(timezone.utc)
                 - timedelta(days=17),  # 10 days overdue
                 return_date=datetime.now(timezone.utc) - timedelta(days=1),
-                overdue_fine=20.0,  # 10 days * $2/day
             )
             borrow2 = Borrow(
                 user_id=test_user.id,
@@ -57,12 +57,15 @@ def client():
                 borrow_date=datetime.now(timezone.utc)
                 - timedelta(days=14),  # 7 days overdue
                 return_date=None,
-                overdue_fine=14.0,  # 7 days * $2/day
             )
             db.session.add(borrow1)
             db.session.add(borrow2)
             db.session.commit()
 
+            assess_fine(db.session, borrow1, 2000)  # 10 days * $2/day
+            assess_fine(db.session, borrow2, 1400)  # 7 days * $2/day
+            db.session.commit()
+
             access_token = create_access_token(identity=test_user.id)
             client.access_token = access_token
 